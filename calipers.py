@@ -0,0 +1,178 @@
+import random
+from fractions import Fraction
+from time import perf_counter
+
+from geometry import cross, dist, convex_hull, polygon_area_twice
+
+# Once the convex hull of the points has been computed, many questions
+# about the shape of the point set can be answered by walking around the
+# hull with two or more pointers that each only ever move forward, as if
+# rotating a pair of calipers around the hull. Every such question then
+# takes only O(h) time for the hull of h corner points, instead of
+# looping through all pairs of points.
+# https://en.wikipedia.org/wiki/Rotating_calipers
+
+# The functions in this module take a convex polygon without redundant
+# corner points on its edges, as produced by convex_hull, in either
+# orientation. Distances and areas are squared or given as fractions,
+# so that all answers are exact.
+
+
+def __ccw(hull):
+    hull = list(hull)
+    return hull if polygon_area_twice(hull) >= 0 else hull[::-1]
+
+
+def __dot(p1, p2, p3):
+    (x1, y1), (x2, y2), (x3, y3) = p1, p2, p3
+    return (x2 - x1) * (x3 - x1) + (y2 - y1) * (y3 - y1)
+
+
+# For each edge i of the hull, the corner j farthest away from the line
+# of the edge. As the edge turns around the hull, that corner moves
+# forward around the hull in the same direction. The corners of the edge
+# and the corner j are antipodal, that is, the hull fits between two
+# parallel lines through them.
+
+def antipodal_pairs(hull):
+    hull = __ccw(hull)
+    h = len(hull)
+    if h < 3:
+        if h == 2:
+            yield 0, 1
+        return
+    j = 1
+    for i in range(h):
+        p, q = hull[i], hull[(i + 1) % h]
+        while cross(p, q, hull[(j + 1) % h]) > cross(p, q, hull[j]):
+            j = (j + 1) % h
+        yield i, j
+        yield (i + 1) % h, j
+
+
+# The diameter is the farthest pair of points, always an antipodal pair
+# of the hull. Returns the pair of points.
+
+def diameter(hull):
+    hull = __ccw(hull)
+    if len(hull) == 1:
+        return hull[0], hull[0]
+    i, j = max(antipodal_pairs(hull), key=lambda ij: dist(hull[ij[0]], hull[ij[1]]))
+    return hull[i], hull[j]
+
+
+# The minimum width of the hull is the smallest distance between two
+# parallel lines that the hull fits between. One of these lines always
+# goes along some edge of the hull. Returns the squared width as an exact
+# fraction, and the index of that edge from hull[i] to hull[i+1].
+
+def minimum_width(hull):
+    hull = __ccw(hull)
+    h = len(hull)
+    if h < 3:
+        return Fraction(0), 0
+    best, j = None, 1
+    for i in range(h):
+        p, q = hull[i], hull[(i + 1) % h]
+        while cross(p, q, hull[(j + 1) % h]) > cross(p, q, hull[j]):
+            j = (j + 1) % h
+        width = Fraction(cross(p, q, hull[j]) ** 2, dist(p, q))
+        if best is None or width < best[0]:
+            best = (width, i)
+    return best
+
+
+# The minimum-area rectangle that contains the hull also has one side
+# along some edge of the hull. For each edge, the other three sides touch
+# the hull at the corners that are farthest forward along the edge, the
+# farthest away from the edge, and the farthest backward along the edge.
+# All three corners move forward around the hull as the edge turns.
+# Returns the area and the four corners of the rectangle as fractions.
+
+def minimum_area_rectangle(hull):
+    hull = __ccw(hull)
+    h = len(hull)
+    if h < 3:
+        return Fraction(0), [hull[0], hull[-1], hull[-1], hull[0]]
+    best, k, j, m = None, 1, None, None
+    for i in range(h):
+        p, q = hull[i], hull[(i + 1) % h]
+        while __dot(p, q, hull[(k + 1) % h]) > __dot(p, q, hull[k]):
+            k = (k + 1) % h
+        j = k if j is None else j
+        while cross(p, q, hull[(j + 1) % h]) > cross(p, q, hull[j]):
+            j = (j + 1) % h
+        m = j if m is None else m
+        while __dot(p, q, hull[(m + 1) % h]) < __dot(p, q, hull[m]):
+            m = (m + 1) % h
+        d2 = dist(p, q)
+        length = __dot(p, q, hull[k]) - __dot(p, q, hull[m])
+        height = cross(p, q, hull[j])
+        area = Fraction(length * height, d2)
+        if best is None or area < best[0]:
+            best = (area, i, j, k, m)
+    area, i, j, k, m = best
+    p, q = hull[i], hull[(i + 1) % h]
+    (dx, dy), d2 = (q[0] - p[0], q[1] - p[1]), dist(p, q)
+
+    # The point at distances s along the edge and t to its left, in units
+    # of the edge length.
+    def corner(s, t):
+        return p[0] + s * dx - t * dy, p[1] + s * dy + t * dx
+    s0, s1 = Fraction(__dot(p, q, hull[m]), d2), Fraction(__dot(p, q, hull[k]), d2)
+    t1 = Fraction(cross(p, q, hull[j]), d2)
+    return area, [corner(s0, 0), corner(s1, 0), corner(s1, t1), corner(s0, t1)]
+
+
+def __demo():
+    rng = random.Random(12345)
+    # Gold testing against brute force over all pairs and all edges.
+    for trial in range(300):
+        m = rng.choice([3, 10, 100, 10**6])
+        pts = [(rng.randint(-m, m), rng.randint(-m, m)) for _ in range(rng.randint(3, 50))]
+        hull = convex_hull(pts)
+        if len(hull) < 3:
+            continue
+        if trial % 2 == 1:
+            hull = hull[::-1]
+        p, q = diameter(hull)
+        assert dist(p, q) == max(dist(a, b) for a in pts for b in pts)
+        h = len(hull)
+        widths = [Fraction(max(cross(hull[i], hull[(i + 1) % h], r) ** 2 for r in hull),
+                           dist(hull[i], hull[(i + 1) % h])) for i in range(h)]
+        assert minimum_width(hull)[0] == min(widths)
+        area, corners = minimum_area_rectangle(hull)
+        assert polygon_area_twice(corners) == 2 * area
+        # The rectangle contains every point of the hull.
+        assert all(cross(corners[c - 1], corners[c], r) >= 0 for c in range(4) for r in hull)
+        ccw = hull if polygon_area_twice(hull) > 0 else hull[::-1]
+        brute = []
+        for i in range(h):
+            a, b = ccw[i], ccw[(i + 1) % h]
+            dots = [(b[0] - a[0]) * (r[0] - a[0]) + (b[1] - a[1]) * (r[1] - a[1]) for r in hull]
+            brute.append(Fraction((max(dots) - min(dots)) * max(cross(a, b, r) for r in hull), dist(a, b)))
+        assert area == min(brute)
+    print("Rotating calipers agree with brute force for diameter, width and rectangle.")
+
+    n = 10**5
+    pts = [(rng.randint(-10**6, 10**6), rng.randint(-10**6, 10**6)) for _ in range(n)]
+    pts = [(x, y) for (x, y) in pts if x * x + y * y <= 10**12]
+    hull = convex_hull(pts)
+    print(f"The convex hull of {len(pts)} points in a circle has {len(hull)} corners.")
+    start = perf_counter()
+    p, q = diameter(hull)
+    width, _ = minimum_width(hull)
+    area, corners = minimum_area_rectangle(hull)
+    print(f"Calipers took {perf_counter() - start:.3f} seconds.")
+    print(f"Diameter is between {p} and {q}, squared {dist(p, q)}.")
+    print(f"Squared minimum width is about {float(width):.1f}.")
+    print(f"Minimum bounding rectangle has area about {float(area):.1f}, corners")
+    print([(round(float(x), 2), round(float(y), 2)) for (x, y) in corners])
+    start = perf_counter()
+    brute = max(dist(a, b) for a in hull for b in hull)
+    print(f"Brute force diameter over the hull took {perf_counter() - start:.3f} seconds.")
+    assert brute == dist(p, q)
+
+
+if __name__ == "__main__":
+    __demo()
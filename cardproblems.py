@@ -1,5 +1,8 @@
 from random import Random
 from itertools import combinations
+from multiprocessing import Pool
+
+from ranking import combinations_shard
 
 # When using random numbers, hardcode the seed to make results reproducible.
 
@@ -134,21 +137,38 @@ def poker_high_card(hand):
 # https://en.wikipedia.org/wiki/List_of_poker_hands
 
 
-def evaluate_all_poker_hands():
-    funcs = [poker_one_pair, poker_two_pair, poker_three_of_kind,
-             poker_straight, poker_flush, poker_full_house,
-             poker_four_of_kind, poker_straight_flush, poker_high_card]
-    counters = [0 for _ in funcs]
-    for hand in combinations(deck, 5):
-        for (i, f) in enumerate(funcs):
+# The same count can be split into n shards of about equal size, each
+# shard starting directly from its own first hand. This allows several
+# processes to each count one shard, and the counts to be added up.
+
+__poker_funcs = [poker_one_pair, poker_two_pair, poker_three_of_kind,
+                 poker_straight, poker_flush, poker_full_house,
+                 poker_four_of_kind, poker_straight_flush, poker_high_card]
+
+
+def evaluate_poker_hands_shard(i, n):
+    counters = [0 for _ in __poker_funcs]
+    hands = combinations(deck, 5) if n == 1 else combinations_shard(deck, 5, i, n)
+    for hand in hands:
+        for (j, f) in enumerate(__poker_funcs):
             if f(hand):
-                counters[i] += 1
+                counters[j] += 1
                 break  # No point looking for more for this hand
-    result = [(f.__name__, count) for (f, count) in zip(funcs, counters)]
+    return counters
+
+
+def evaluate_all_poker_hands(processes=1):
+    if processes == 1:
+        counters = evaluate_poker_hands_shard(0, 1)
+    else:
+        with Pool(processes) as pool:
+            shards = pool.starmap(evaluate_poker_hands_shard, [(i, processes) for i in range(processes)])
+        counters = [sum(column) for column in zip(*shards)]
+    result = [(f.__name__, count) for (f, count) in zip(__poker_funcs, counters)]
     expected = [1098240, 123552, 54912, 9180, 5112, 3744, 624, 36, 1303560]
     assert [count for (_, count ) in result] == expected
     return result
 
 
 if __name__ == "__main__":
-    print(evaluate_all_poker_hands())
+    print(evaluate_all_poker_hands(processes=4))
@@ -0,0 +1,214 @@
+import random
+from math import cos, sin, pi
+from fractions import Fraction
+from time import perf_counter
+
+from geometry import cross, polygon_area_twice, point_inside_convex_polygon, convex_hull
+from sweepline import intersection_point
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# The intersection of two convex polygons is also a convex polygon, and
+# its boundary consists of pieces of the boundaries of the two polygons.
+# Instead of testing every edge of one polygon against every edge of the
+# other, O'Rourke's algorithm walks around both polygons at the same time
+# so that the edge of one polygon always chases the edge of the other,
+# which finds the intersection in O(n + m) time for polygons of n and m
+# corners. (Computational Geometry in C, section 7.6.)
+
+# Clipping an arbitrary polygon against a convex window is simpler: for
+# each edge of the window in turn, keep the part of the polygon that lies
+# on the inner side of the line of that edge. This Sutherland-Hodgman
+# algorithm takes O(n * m) time, fine for the usual small windows.
+
+# All predicates are exact, since the new corner points are computed as
+# fractions, and cross works on them just as well as on integers.
+
+# Both functions accept polygons as lists of tuples, Polygon objects or
+# NumPy arrays of shape (n, 2), in either orientation. The results are
+# lists of points in counterclockwise order.
+
+def __ccw(poly):
+    if np is not None and isinstance(poly, np.ndarray):
+        poly = [tuple(p) for p in poly.tolist()]
+    poly = list(poly)
+    return poly if polygon_area_twice(poly) >= 0 else poly[::-1]
+
+
+# Integer points are kept as integers.
+
+def __exact(x):
+    return int(x) if x.denominator == 1 else x
+
+
+# Remove consecutive duplicates, also those that wrap around.
+
+def __dedup(pts):
+    result = []
+    for p in pts:
+        if not result or result[-1] != p:
+            result.append(p)
+    while len(result) > 1 and result[0] == result[-1]:
+        result.pop()
+    return result
+
+
+# Collinear segments pq and rs that overlap in more than one point.
+
+def __overlap(p, q, r, s):
+    if cross(p, q, r) != 0 or cross(p, q, s) != 0:
+        return None
+    key = (lambda a: a[0]) if p[0] != q[0] else (lambda a: a[1])
+    (a, b), (c, d) = sorted([p, q], key=key), sorted([r, s], key=key)
+    lo, hi = max(a, c, key=key), min(b, d, key=key)
+    return (lo, hi) if key(lo) < key(hi) else None
+
+
+def convex_intersection(poly1, poly2):
+    P, Q = __ccw(poly1), __ccw(poly2)
+    n, m = len(P), len(Q)
+    # Which polygon's boundary the chase is currently walking inside the other.
+    unknown, p_in, q_in = 0, 1, 2
+    inside, result = unknown, []
+    a = b = aa = ba = 0
+    while (aa < n or ba < m) and aa < 2 * n and ba < 2 * m:
+        a1, b1 = P[a - 1], Q[b - 1]
+        A, B = (P[a][0] - a1[0], P[a][1] - a1[1]), (Q[b][0] - b1[0], Q[b][1] - b1[1])
+        c = cross((0, 0), A, B)
+        a_in_q = cross(b1, Q[b], P[a])
+        b_in_p = cross(a1, P[a], Q[b])
+        if c == 0:
+            # The edges are parallel, and may overlap in opposite directions
+            # only when the intersection is that overlapping segment.
+            shared = __overlap(a1, P[a], b1, Q[b])
+            if shared is not None and A[0] * B[0] + A[1] * B[1] < 0:
+                return list(shared)
+            if a_in_q < 0 and b_in_p < 0:
+                return []
+        else:
+            x = intersection_point((a1, P[a]), (b1, Q[b]))
+            if x is not None:
+                # Both polygons get walked around once more from the first
+                # crossing point.
+                if not result:
+                    aa = ba = 0
+                result.append(x)
+                if a_in_q > 0:
+                    inside = p_in
+                elif b_in_p > 0:
+                    inside = q_in
+        # Advance the edge that is pointing towards the other one, or if
+        # neither is, the one that is outside the other.
+        if c == 0 and a_in_q == 0 and b_in_p == 0:
+            advance_a = inside != p_in
+        elif c >= 0:
+            advance_a = b_in_p > 0
+        else:
+            advance_a = a_in_q <= 0
+        if advance_a:
+            if inside == p_in:
+                result.append(P[a])
+            a, aa = (a + 1) % n, aa + 1
+        else:
+            if inside == q_in:
+                result.append(Q[b])
+            b, ba = (b + 1) % m, ba + 1
+    if inside == unknown:
+        # The boundaries never crossed, so one polygon is inside the other,
+        # or they are disjoint, or they touch at some point that was found.
+        if all(point_inside_convex_polygon(Q, p) for p in P):
+            return P
+        if all(point_inside_convex_polygon(P, q) for q in Q):
+            return Q
+    return __dedup(result)
+
+
+# Clip the subject polygon against the convex window. A concave subject
+# that the window cuts into several pieces comes out as one polygon whose
+# pieces are joined by edges that run along the window boundary.
+
+def clip(subject, window):
+    result, W = __ccw(subject), __ccw(window)
+    for i in range(len(W)):
+        a, b = W[i - 1], W[i]
+        pts, result = result, []
+        if not pts:
+            break
+        s = pts[-1]
+        cs = cross(a, b, s)
+        for e in pts:
+            ce = cross(a, b, e)
+            # The edge s-e crosses the line of the window edge.
+            if (cs < 0 <= ce) or (ce < 0 <= cs):
+                if cs != 0 and ce != 0:
+                    t = Fraction(cs, cs - ce)
+                    result.append((__exact(s[0] + t * (e[0] - s[0])), __exact(s[1] + t * (e[1] - s[1]))))
+            if ce >= 0:
+                result.append(e)
+            s, cs = e, ce
+        result = __dedup(result)
+    return result
+
+
+def __demo():
+    rng = random.Random(12345)
+
+    def random_convex(k, m, cx=0, cy=0):
+        pts = [(cx + rng.randint(-m, m), cy + rng.randint(-m, m)) for _ in range(k)]
+        return convex_hull(pts)
+
+    def area(pts):
+        return polygon_area_twice(pts) if pts else 0
+
+    # Gold testing of the chase against clipping, the same region with any
+    # redundant corners removed. Small coordinates produce many shared
+    # corners, collinear edges and touching polygons.
+    for trial in range(3000):
+        m = rng.choice([2, 3, 5, 20, 1000])
+        P = random_convex(rng.randint(3, 12), m)
+        Q = random_convex(rng.randint(3, 12), m, rng.randint(-m, m), rng.randint(-m, m))
+        if len(P) < 3 or len(Q) < 3:
+            continue
+        if trial % 3 == 1:
+            P = P[::-1]
+        elif trial % 3 == 2:
+            Q = np.array(Q) if np is not None else Q[::-1]
+        expected = clip(P, Q)
+        found = convex_intersection(P, Q)
+        assert area(found) == area(expected), (P, Q, found, expected)
+        assert all(point_inside_convex_polygon(__ccw(Q), p) and point_inside_convex_polygon(__ccw(P), p)
+                   for p in found)
+        if area(expected) > 0:
+            assert convex_hull(found) == convex_hull(expected)
+    print("Convex intersection agrees with clipping for random convex polygons.")
+
+    square = [(0, 0), (4, 0), (4, 4), (0, 4)]
+    print(f"Squares: {convex_intersection(square, [(2, 2), (6, 2), (6, 6), (2, 6)])}")
+    print(f"Square and diamond: {convex_intersection(square, [(2, -1), (5, 2), (2, 5), (-1, 2)])}")
+    print(f"Squares sharing an edge: {convex_intersection(square, [(4, 0), (8, 0), (8, 4), (4, 4)])}")
+    print(f"Disjoint: {convex_intersection(square, [(5, 0), (8, 0), (8, 4)])}")
+    u = [(0, 0), (6, 0), (6, 6), (4, 6), (4, 2), (2, 2), (2, 6), (0, 6)]
+    print(f"U-shape clipped to a triangle: {clip(u, [(-1, 4), (7, 4), (3, 8)])}")
+
+    # Convex polygons with n corners on a big circle.
+    def circle(n, r, cx=0, cy=0):
+        pts = [(cx + round(r * cos(2 * pi * i / n)), cy + round(r * sin(2 * pi * i / n))) for i in range(n)]
+        return convex_hull(pts)
+
+    for n in [100, 1000]:
+        P, Q = circle(n, 10**9), circle(n, 10**9, 10**9 // 2, 10**8)
+        start = perf_counter()
+        found = convex_intersection(P, Q)
+        t1 = perf_counter() - start
+        start = perf_counter()
+        expected = clip(P, Q)
+        t2 = perf_counter() - start
+        assert area(found) == area(expected)
+        print(f"Polygons of {len(P)} and {len(Q)} corners: chase {t1:.3f}, clip {t2:.3f} seconds.")
+
+
+if __name__ == "__main__":
+    __demo()
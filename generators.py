@@ -1,5 +1,6 @@
 from random import Random
 from fractions import Fraction
+from math import gcd, isqrt, comb
 
 # For the Aronson sequence below
 
@@ -8,7 +9,7 @@ from int_to_english import int_to_english
 # The itertools module defines tons of handy functions to perform
 # computations on existing iterators, to be combined arbitrarily.
 
-from itertools import takewhile, islice, permutations, combinations, combinations_with_replacement
+from itertools import takewhile, islice, repeat, count, permutations, combinations, combinations_with_replacement
 
 # The "double-ended queue" or "deque" allows efficient push
 # and pop operations from both ends of the queue, whereas a
@@ -16,6 +17,15 @@ from itertools import takewhile, islice, permutations, combinations, combination
 
 from collections import deque
 
+# NumPy is needed only by the block mode functions that emit whole
+# arrays of elements at the time. The rest of this module works just
+# fine in a plain Python installation without NumPy.
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 # A generator is a function that, unlike a regular function that
 # always forgets what it has done and starts from beginning each
 # time it is called, a generator remembers where it left off and
@@ -48,12 +58,41 @@ def fibonacci(a=1, b=1):
 # to replace loops with lazy sequences, this function could be
 # written in a more pretty form with itertools functions.
 
-def pyramid_series():
-    v = 1
+def pyramid_series(start=0):
+    # Jump directly to the element in position start.
+    v = pyramid_value(start)
+    first = v * (v+1) // 2 - start
     while True:
-        for _ in range(v):
+        for _ in range(first):
             yield v
         v += 1
+        first = v
+
+
+# The value v occupies the positions from v(v-1)/2 to v(v+1)/2 - 1 of
+# the previous sequence, counting from zero. Solving the quadratic
+# inequality v(v-1)/2 <= i with an integer square root gives us the
+# element in position i directly, without iterating through the
+# earlier elements of the sequence.
+
+def pyramid_value(i):
+    return (1 + isqrt(8*i + 1)) // 2
+
+
+# The elements in positions start to stop-1 as a NumPy array. Each value
+# is repeated as many times as it occurs inside that range.
+
+def pyramid_block(start, stop):
+    if stop <= start:
+        return np.zeros(0, dtype=np.int64)
+    v0, v1 = pyramid_value(start), pyramid_value(stop - 1)
+    values = np.arange(v0, v1 + 1, dtype=np.int64)
+    counts = values.copy()
+    counts[0] = v0 * (v0+1) // 2 - start
+    counts[-1] -= v1 * (v1+1) // 2 - stop
+    if v0 == v1:
+        counts[0] = stop - start
+    return np.repeat(values, counts)
 
 
 # Finite for all values of start, or infinite for some? Nobody knows!
@@ -93,6 +132,45 @@ def scale_random(seed, scale, skip):
             count = 0
 
 
+# Generating millions of test cases one element at the time is
+# dominated by the overhead of each call to next and randint. In block
+# mode, the entire level k (counting from zero) of skip elements whose
+# random increases are taken from range 1 to scale**(k+1) is produced
+# as a NumPy array in one swoop. To allow independent workers to jump
+# directly to level k without generating the earlier levels, the mapping
+# from seed to the random stream is made explicit:
+#
+# 1. The increases inside level k are drawn from the NumPy generator
+#    np.random.default_rng([seed, k]), so each level has its own stream
+#    that is independent of the streams of all other levels.
+# 2. Level k starts from the base value 1 + skip * (s + s**2 + ... + s**k)
+#    where s is the original scale. No element of the earlier levels can
+#    reach this base, so the sequence remains strictly increasing.
+#
+# The elements are 64-bit integers, so the levels end once the largest
+# possible element of the next level would no longer fit into int64.
+# The block mode produces different random numbers than scale_random,
+# since the random number generators of Python and NumPy are different.
+
+def scale_random_level(seed, scale, skip, k):
+    base = 1 + skip * sum(scale**j for j in range(1, k+1))
+    top = scale**(k+1)
+    if base + skip * top >= 2**63:
+        raise OverflowError(f"Level {k} does not fit in 64-bit integers.")
+    rng = np.random.default_rng([seed, k])
+    return base + np.cumsum(rng.integers(1, top, size=skip, endpoint=True, dtype=np.int64))
+
+
+def scale_random_blocks(seed, scale, skip):
+    k = 0
+    while True:
+        try:
+            yield scale_random_level(seed, scale, skip, k)
+        except OverflowError:
+            return
+        k += 1
+
+
 # Prime numbers, remembering all the prime numbers generated so far. To
 # test whether a number is prime, it is sufficient to test divisibility
 # only by the smaller primes found so far.
@@ -122,13 +200,57 @@ def primes():
 # rapidly to the square root of n.
 
 def theons_ladder(n=2, a=1, b=1):
+    for (a, b) in theons_ladder_pairs(n, a, b):
+        yield Fraction(a, b)
+
+
+# The same ladder as raw integer pairs (a, b) in lowest terms, without
+# allocating a Fraction object for each step. Dividing both numbers by
+# their gcd produces the same pairs that Fraction would produce.
+
+def theons_ladder_pairs(n=2, a=1, b=1):
     while True:
-        f = Fraction(a, b)
-        yield f
-        # Let the Fraction class simplify these numbers.
-        a, b = f.numerator, f.denominator
+        g = gcd(a, b)
+        a, b = a // g, b // g
+        yield a, b
         # Original Theon's ladder was just n = 2.
-        a, b = a + n * b, a+b
+        a, b = a + n * b, a + b
+
+
+# Each step of the ladder is a linear function of the previous pair,
+# that is, the pair is multiplied by the matrix [[1, n], [1, 1]]. The
+# common factors removed along the way do not change the fraction, so
+# the term k can be computed by raising this matrix to the power k
+# with the same repeated squaring technique as in binary_power of
+# recursion.py, taking only O(log k) big integer multiplications.
+
+def __matrix_mul(m1, m2):
+    (a, b, c, d), (e, f, g, h) = m1, m2
+    return a*e + b*g, a*f + b*h, c*e + d*g, c*f + d*h
+
+
+def theons_ladder_term(n, k, a=1, b=1):
+    result, m = (1, 0, 0, 1), (1, n, 1, 1)
+    while k > 0:
+        if k % 2 == 1:
+            result = __matrix_mul(result, m)
+        m = __matrix_mul(m, m)
+        k = k // 2
+    (p, q, r, s) = result
+    a, b = p * a + q * b, r * a + s * b
+    g = gcd(a, b)
+    return a // g, b // g
+
+
+# For n = 2, the terms in even positions of Theon's ladder produce the
+# Pythagorean triples (s, s+1, h) whose legs differ by exactly one. The
+# equation s^2 + (s+1)^2 = h^2 can be solved directly for the shorter
+# leg s as an integer square root, no binary search needed. Since these
+# numbers quickly outgrow the 64-bit integers of NumPy, the exact
+# isqrt of the math module is used for the entire batch of hypotenuses.
+
+def pythagorean_legs(hypotenuses):
+    return [(isqrt(2*h*h - 1) - 1) // 2 for h in hypotenuses]
 
 
 # The next technique comes handy sometimes. Iterate through all integer
@@ -149,6 +271,115 @@ def all_pairs():
 # to systematically sweep through this infinite plane until
 # you find the (a, b) that is closest to origin (0, 0).
 
+# The position of each pair in the previous sequence can be computed
+# directly. The anti-diagonals before the pair (a, b) contain exactly
+# 1 + 2 + ... + (a+b) pairs, after which a more steps are needed. The
+# other way around, the anti-diagonal of the pair in position r is the
+# largest s for which s(s+1)/2 <= r, solved with an integer square root.
+
+def pair_rank(a, b):
+    s = a + b
+    return s * (s+1) // 2 + a
+
+
+def pair_unrank(r):
+    s = (isqrt(8*r + 1) - 1) // 2
+    a = r - s * (s+1) // 2
+    return a, s-a
+
+
+# The same idea generalizes to tuples of k natural numbers, visited in
+# order of their sums, and the tuples of the same sum visited in the
+# order of first element, then second element and so on. For k = 2,
+# this produces exactly the same sequence as all_pairs.
+
+def all_tuples(k):
+    s = 0
+    while True:
+        yield from __tuples_with_sum(k, s)
+        s += 1
+
+
+def __tuples_with_sum(k, s):
+    if k == 1:
+        yield s,
+    else:
+        for a in range(s + 1):
+            for rest in __tuples_with_sum(k-1, s-a):
+                yield (a,) + rest
+
+
+# There are comb(s+k-1, k) tuples of k natural numbers whose sum is less
+# than s. Each element x of the tuple, in turn, skips over the tuples
+# whose element in that position is less than x, and by the hockey stick
+# identity of Pascal's triangle, there are exactly comb(s+m, m) minus
+# comb(s-x+m, m) of them when m elements remain after this position.
+
+def tuple_rank(tup):
+    k, s = len(tup), sum(tup)
+    r = comb(s + k - 1, k)
+    for (i, x) in enumerate(tup[:-1]):
+        m = k - i - 1
+        r += comb(s + m, m) - comb(s - x + m, m)
+        s -= x
+    return r
+
+
+# To unrank, find each unknown with exponential and binary search for
+# the largest value whose count of tuples before it does not exceed r.
+
+def __largest_below(f, r, hi=None):
+    lo = 0
+    if hi is None:
+        hi = 1
+        while f(hi) <= r:
+            lo, hi = hi, 2 * hi
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if f(mid) <= r:
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+def tuple_unrank(r, k):
+    if k == 2:
+        return pair_unrank(r)
+    s = __largest_below(lambda t: comb(t + k - 1, k), r)
+    r -= comb(s + k - 1, k)
+    result = []
+    for i in range(k - 1):
+        m = k - i - 1
+        x = __largest_below(lambda t: comb(s + m, m) - comb(s - t + m, m), r, s + 1)
+        r -= comb(s + m, m) - comb(s - x + m, m)
+        result.append(x)
+        s -= x
+    result.append(s)
+    return tuple(result)
+
+
+# To split the sweep over the infinite grid between n worker processes,
+# worker number i visits the tuples in positions i, i+n, i+2n, ... so
+# that all workers progress through the grid at the same pace. Since the
+# positions inside each shard are increasing, the first solution that
+# each worker finds is the one closest to the origin in its own shard,
+# and the solution closest to origin overall is simply the one of
+# these first solutions with the smallest rank. A shard might not
+# contain any solutions at all, so the search can be limited to the
+# positions before the given stop, returning None if nothing is found.
+
+def shard(i, n, k=2, stop=None):
+    for r in (count(i, n) if stop is None else range(i, stop, n)):
+        yield tuple_unrank(r, k)
+
+
+def shard_search(pred, i, n, k=2, stop=None):
+    for tup in shard(i, n, k, stop):
+        if pred(*tup):
+            return tup
+    return None
+
 
 # The Kolakoski sequence whose elements describe the run-length
 # encoding of that very same sequence. That is, this sequence
@@ -169,15 +400,127 @@ def kolakoski(n=2):
             q.append(prev)
 
 
-# Another cute self describing sequence, this one with words.
+# The previous generator keeps every element that it has computed but
+# not yet yielded in its queue, so that its memory use grows linearly
+# with the number of elements produced. Since the sequence describes its
+# own structure, the run lengths can instead be read from another copy
+# of this very same generator running behind, which in turn reads its
+# run lengths from a third copy running even further behind, and so on.
+# Each copy is created lazily only when its parent first needs it, and
+# since the runs have average length above one, each level runs behind
+# its parent by a constant factor. Producing the first m elements thus
+# needs only O(log m) levels of generators alive at the same time.
+
+def kolakoski_lean(n=2):
+    # Runs 0 and 1 are hardcoded to bootstrap the recursion.
+    yield from (1, 2, 2)
+    child = kolakoski_lean(n)
+    # Skip the first two elements that describe runs 0 and 1.
+    next(child)
+    next(child)
+    for (k, v) in enumerate(child, 2):
+        # Run number k consists of v copies of the symbol k % n + 1.
+        yield from repeat(k % n + 1, v)
+
+
+# The same recursive scheme works even better for whole blocks of
+# elements, since NumPy can expand a block of run lengths into
+# the block of elements that they describe with np.repeat, without
+# any Python level loops over individual elements. Each block of run
+# lengths is split into pieces of at most size elements, so that
+# every level keeps only a bounded amount of memory alive.
+
+def __kolakoski_level(n, size):
+    yield np.array([1, 2, 2], dtype=np.uint8)
+    child, k, skip = __kolakoski_level(n, size), 2, 2
+    for lengths in child:
+        lengths, skip = lengths[skip:], 0
+        for i in range(0, len(lengths), size):
+            piece = lengths[i:i+size]
+            symbols = (np.arange(k, k + len(piece)) % n + 1).astype(np.uint8)
+            yield np.repeat(symbols, piece)
+            k += len(piece)
+
+
+# Blocks produced by the levels have varying sizes, so regroup them into
+# uint8 arrays of exactly the given size for the convenience of the user.
+
+def kolakoski_blocks(n=2, size=2**16):
+    buffer, total = [], 0
+    for block in __kolakoski_level(n, size):
+        buffer.append(block)
+        total += len(block)
+        while total >= size:
+            merged = np.concatenate(buffer)
+            yield merged[:size]
+            buffer, total = [merged[size:]], total - size
+
+
+# Streaming counter for the density of ones in the Kolakoski sequence,
+# an open problem in number theory. Yields the pairs (m, ones) where
+# ones is the number of ones among the first m elements of the sequence,
+# after every block. The memory use remains tiny no matter how many
+# billions of elements we plough through, as long as we have patience.
+
+def kolakoski_density(n=2, size=2**16):
+    m, ones = 0, 0
+    for block in kolakoski_blocks(n, size):
+        m += len(block)
+        ones += int(np.count_nonzero(block == 1))
+        yield m, ones
+
+
+# Another cute self describing sequence, this one with words. The
+# positions still owed to the sentence are kept in a deque, so that
+# removing the first one does not need to copy the entire list.
 
 def aronson(letter='t'):
-    n, owed, fragment = 1, [], f'Letter {letter} is in positions '
-    while True:
+    for fragment in aronson_fragments(letter):
         yield from fragment
+
+
+# The sentence is built in fragments, one number name at the time.
+# Consumers who want millions of characters should use these
+# fragments directly instead of handling each character separately.
+
+def aronson_fragments(letter='t'):
+    n, owed, fragment = 1, deque(), f'Letter {letter} is in positions '
+    while True:
+        yield fragment
         owed.extend(i+n for (i, c) in enumerate(fragment) if c == letter)
         n += len(fragment)
-        fragment, owed = int_to_english(owed[0]) + ', ', owed[1:]
+        fragment = __number_name(owed.popleft()) + ', '
+
+
+# The first m characters of the sentence as a single string.
+
+def aronson_text(m, letter='t'):
+    result, total = [], 0
+    for fragment in aronson_fragments(letter):
+        result.append(fragment)
+        total += len(fragment)
+        if total >= m:
+            return "".join(result)[:m]
+
+
+# The names of numbers below one thousand are looked up from a table
+# precomputed once, and the names of larger numbers are put together
+# from these names in blocks of three digits. The numbers in the
+# Aronson sentence grow only linearly, so the fallback to compute the
+# name from scratch for numbers at least one billion hardly ever runs.
+
+__names = tuple(int_to_english(n) for n in range(1000))
+
+
+def __number_name(n):
+    if n >= 10**9:
+        return int_to_english(n)
+    result = []
+    for (p, power) in ((10**6, " million"), (1000, " thousand"), (1, "")):
+        block = n // p % 1000
+        if block > 0:
+            result.append(__names[block] + power)
+    return " ".join(result) if result else __names[0]
 
 
 # Since a generator can take parameters, we can write a iterator
@@ -217,6 +560,9 @@ def __demo():
     print("First twenty Fibonacci numbers are:")
     print(", ".join(str(f) for f in fib_list))
 
+    print("Elements of the pyramid series from position 10**12 onwards:")
+    print(list(islice(pyramid_series(10**12), 10)))
+
     # Functions every_kth and stutter cancel each other out.
     print("Collatz sequence starting from 12345 is:")
     print(list(every_kth(stutter(collatz(12345), 3), 3)))
@@ -231,40 +577,63 @@ def __demo():
     print("Here are the first 1000 elements of Kolakoski(3):")
     print("".join(str(x) for x in islice(kolakoski(3), 1000)))
 
+    print("The lean Kolakoski generator produces the same elements:")
+    print(all(x == y for (x, y) in islice(zip(kolakoski(3), kolakoski_lean(3)), 10**5)))
+
+    if np is not None:
+        print("Here is the density of ones in the first ten million elements of Kolakoski(2):")
+        for (m, ones) in islice(kolakoski_density(2), 9, None, 10):
+            print(f"{m}: {ones / m:.7f}", end="  ")
+            if m >= 10**7:
+                break
+        print()
+
     print("First 1000 characters of modified Aronson infinite t-sentence:")
     print("".join(islice(aronson(), 1000)))
 
     print("First 1000 characters of modified Aronson infinite e-sentence:")
     print("".join(islice(aronson('e'), 1000)))
 
+    print("Character 10**6 of the Aronson t-sentence and its surroundings:")
+    print(aronson_text(10**6 + 30)[10**6 - 30:])
+
     print("Here are 100 random numbers from increasing scales:")
     print(", ".join(str(x) for x in islice(scale_random(123, 10, 5), 100)))
 
     print("Here are 100 random numbers from another scale:")
     print(", ".join(str(x) for x in islice(scale_random(123, 5, 10), 100)))
 
+    if np is not None:
+        print("Here are the levels of random numbers in block mode:")
+        for block in islice(scale_random_blocks(123, 10, 5), 6):
+            print(block)
+        print("Level 10 produced directly, without the earlier levels:")
+        print(scale_random_level(123, 10, 5, 10))
+
     print("Let us examine Theon's ladder for square root of 7.")
     for i, f in enumerate(islice(theons_ladder(7), 50)):
         print(f"{i}: a = {f.numerator}, b = {f.denominator} error = {float(7 - f*f):.11}")
 
     print("For c = 2, terms in even positions of Theon's ladder give precisely")
     print("the Pythagorean triples whose legs differ by exactly one:")
-    for f in islice(theons_ladder(2), 0, 40, 2):
-        a, b = f.numerator, f.denominator
-        h, s, e = b, 1, b
-        while s < e:
-            m = (s+e) // 2
-            v = m**2 + (m+1)**2
-            if v < h*h:
-                s = m+1
-            else:
-                e = m
+    hs = [b for (a, b) in islice(theons_ladder_pairs(2), 0, 40, 2)]
+    for (s, h) in zip(pythagorean_legs(hs), hs):
         print(f"({s}, {s+1}, {h})", end=" ")
     print()
 
+    a, b = theons_ladder_term(2, 10**4)
+    print(f"Term 10**4 of the ladder for n = 2 has {len(str(b))} digits in its denominator.")
+
     # What other mysteries of number theory are hiding inside this
     # ladder for various other starting values of a, b and c?
 
+    print("Splitting the search for a*a + b*b == 5**6 with 0 < a < b between four workers:")
+    def pred(a, b):
+        return 0 < a < b and a*a + b*b == 5**6
+    found = [shard_search(pred, i, 4, stop=pair_rank(0, 200)) for i in range(4)]
+    best = min((tup for tup in found if tup is not None), key=tuple_rank)
+    print(f"The workers found {found}, closest to origin is {best}.")
+
     # Iterators can be combined into various combinatorial possibilities.
     # Again, even though there are exponentially many elements produced,
     # these elements are generated lazily one at the time as needed. We
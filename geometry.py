@@ -2,7 +2,19 @@
 # -- Leopold Kronecker
 
 import random
-from functools import cmp_to_key
+from array import array
+from fractions import Fraction
+from heapq import heappush, heappushpop
+from bisect import bisect_left, bisect_right, insort
+from math import isqrt, gcd
+
+# NumPy is needed only for the functions that take their points as
+# NumPy arrays, so that the rest of this module works without it.
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # Computational geometry is that what we can done with nothing
 # but integers and their basic arithmetic operations. No trig
@@ -24,6 +36,56 @@ def cross(p1, p2, p3):
 # parallelogram defined by the corner points p1, p2 and p3. The
 # area of the triangle is therefore exactly half of that.
 
+# With float coordinates, the cross product is computed with rounding
+# errors that can give the wrong sign to turns that are nearly straight,
+# and with huge integers, calling cross for each triple one at a time
+# is slow. The function orientations computes the signs of the cross
+# products for entire arrays of triples (P1[i], P2[i], P3[i]) at once.
+# Small integers are computed exactly with 64-bit integers. Otherwise
+# the cross products are computed in floating point, along with a bound
+# for their rounding error (Shewchuk's orient2d filter). Only the rare
+# triples whose cross product is within that bound of zero are computed
+# again exactly with the function cross, floats converted to Fractions.
+# https://www.cs.cmu.edu/~quake/robust.html
+
+__eps = 2.0 ** -53
+__orient_bound = (3 + 16 * __eps) * __eps
+
+
+def orientations(P1, P2, P3):
+    P1, P2, P3 = np.broadcast_arrays(*(np.asarray(p) for p in (P1, P2, P3)))
+    shape = P1.shape[:-1]
+    P1, P2, P3 = (p.reshape(-1, 2) for p in (P1, P2, P3))
+
+    def biggest(p):
+        return 0 if p.size == 0 else int(np.abs(p).max())
+    kinds = {p.dtype.kind for p in (P1, P2, P3)}
+    if kinds <= set('iu') and max(biggest(p) for p in (P1, P2, P3)) < 2**30:
+        (x1, y1), (x2, y2), (x3, y3) = (p.astype(np.int64).T for p in (P1, P2, P3))
+        result = np.sign((x2 - x1) * (y3 - y1) - (y2 - y1) * (x3 - x1)).astype(np.int8)
+        return result.reshape(shape)
+    if not kinds <= set('iuf') or max(biggest(p) if p.dtype.kind != 'f' else 0 for p in (P1, P2, P3)) > 2**53:
+        # Integers too big to convert to floats exactly are used as they are.
+        unsure = np.ones(len(P1), dtype=bool)
+        result = np.zeros(len(P1), dtype=np.int8)
+    else:
+        (x1, y1), (x2, y2), (x3, y3) = (p.astype(np.float64).T for p in (P1, P2, P3))
+        dx2, dy3, dy2, dx3 = x2 - x1, y3 - y1, y2 - y1, x3 - x1
+        left, right = dx2 * dy3, dy2 * dx3
+        det = left - right
+        result = np.sign(det).astype(np.int8)
+        unsure = np.abs(det) <= __orient_bound * (np.abs(left) + np.abs(right))
+        # Differences of floats are zero only for equal floats, so that
+        # these cross products are certainly zero.
+        zero = ((dx2 == 0) | (dy3 == 0)) & ((dy2 == 0) | (dx3 == 0))
+        result[zero] = 0
+        unsure &= ~zero
+    idx = np.flatnonzero(unsure)
+    for (i, p1, p2, p3) in zip(idx, *(p[idx].tolist() for p in (P1, P2, P3))):
+        result[i] = __sign(cross(*((Fraction(x), Fraction(y)) for (x, y) in (p1, p2, p3))))
+    return result.reshape(shape)
+
+
 # The rest of the functions that operate on plane polygons assume
 # that the corner points are given in counterclockwise order.
 # Otherwise, exchange "left" and "right" in each discussion. Also,
@@ -31,14 +93,16 @@ def cross(p1, p2, p3):
 
 # The area of an arbitrary polygon could be computed by splitting it
 # into triangles (an interesting computational geometry problem of
-# its own) and then adding up these triangles. However, we can do
-# better with the shoelace algorithm. It adds up the area of polygon
-# by adding signed triangles viewed from an arbitrary point, usually
-# the origin. These signed areas cancel each other out when adding
-# and subtracting the space outside the polygon.
+# its own, see triangulation.py) and then adding up these triangles.
+# However, we can do better with the shoelace algorithm. It adds up
+# the area of polygon by adding signed triangles viewed from an
+# arbitrary point, usually the origin. These signed areas cancel each
+# other out when adding and subtracting the space outside the polygon.
 
 
 def polygon_area_twice(poly):
+    if isinstance(poly, Polygon):
+        return poly.area_twice
     total, prev = 0, poly[-1]
     for p in poly:
         total += cross((0, 0), prev, p)
@@ -82,6 +146,8 @@ def line_segment_intersect(p0, p1, p2, p3):
 # An polygon is convex iff every turn along its edge is same-handed.
 
 def polygon_is_convex(poly):
+    if isinstance(poly, Polygon):
+        return poly.is_convex
     p1, p2 = poly[-1], poly[-2]
     for p0 in poly:
         if cross(p2, p1, p0) < 0:
@@ -90,6 +156,106 @@ def polygon_is_convex(poly):
     return True
 
 
+# A polygon that keeps its coordinates in two arrays of 64-bit integers
+# instead of a list of tuples, and computes its derived quantities only
+# the first time they are needed. Since it behaves as a sequence of its
+# (x, y) corner points, all the functions of this module that take a
+# polygon accept it as it is, and the functions whose answer is already
+# cached return that answer right away. The polygon cannot be modified
+# after its creation, so that the cached answers never go stale.
+
+class Polygon:
+
+    # No __dict__ for each object, just these fixed attributes.
+    __slots__ = ('__xs', '__ys', '__area', '__convex', '__bbox', '__edges')
+
+    def __init__(self, pts):
+        if isinstance(pts, Polygon):
+            self.__xs, self.__ys = pts.__xs, pts.__ys
+        elif np is not None and isinstance(pts, np.ndarray):
+            # Casting would silently truncate any fractional coordinates.
+            if pts.dtype.kind not in 'iu':
+                raise TypeError(f"Polygon coordinates must be integers, not {pts.dtype}.")
+            pts = pts.astype(np.int64)
+            self.__xs, self.__ys = array('q', pts[:, 0].tobytes()), array('q', pts[:, 1].tobytes())
+        else:
+            self.__xs, self.__ys = array('q', (x for (x, y) in pts)), array('q', (y for (x, y) in pts))
+        self.__area = self.__convex = self.__bbox = self.__edges = None
+
+    def __len__(self):
+        return len(self.__xs)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return Polygon(list(zip(self.__xs[i], self.__ys[i])))
+        return self.__xs[i], self.__ys[i]
+
+    def __iter__(self):
+        return zip(self.__xs, self.__ys)
+
+    def __repr__(self):
+        return f"Polygon({list(self)})"
+
+    # NumPy reads the coordinate arrays as they are, but interleaving them
+    # into rows of (x, y) always makes a copy, so copy=False can't be met.
+
+    def __array__(self, dtype=None, copy=None):
+        if copy is False:
+            raise ValueError("Polygon coordinates can't be viewed as an (n, 2) array without copying.")
+        xs, ys = np.frombuffer(self.__xs, dtype=np.int64), np.frombuffer(self.__ys, dtype=np.int64)
+        result = np.column_stack((xs, ys))
+        return result if dtype is None else result.astype(dtype, copy=False)
+
+    @property
+    def area_twice(self):
+        if self.__area is None:
+            xs, ys = self.__xs, self.__ys
+            self.__area = sum(xs[i - 1] * ys[i] - xs[i] * ys[i - 1] for i in range(len(xs)))
+        return self.__area
+
+    # Positive for counterclockwise, negative for clockwise polygons.
+
+    @property
+    def orientation(self):
+        a = self.area_twice
+        return -1 if a < 0 else (+1 if a > 0 else 0)
+
+    @property
+    def is_convex(self):
+        if self.__convex is None:
+            p1, p2 = self[-1], self[-2]
+            self.__convex = True
+            for p0 in self:
+                if cross(p2, p1, p0) < 0:
+                    self.__convex = False
+                    break
+                p1, p2 = p0, p1
+        return self.__convex
+
+    # The tuple (min_x, min_y, max_x, max_y).
+
+    @property
+    def bbox(self):
+        if self.__bbox is None:
+            xs, ys = self.__xs, self.__ys
+            self.__bbox = (min(xs), min(ys), max(xs), max(ys))
+        return self.__bbox
+
+    # The list of edges, edge i going from corner i - 1 to corner i.
+
+    @property
+    def edges(self):
+        if self.__edges is None:
+            pts = list(self)
+            self.__edges = list(zip(pts[-1:] + pts[:-1], pts))
+        return self.__edges
+
+    # The same polygon in counterclockwise order.
+
+    def counterclockwise(self):
+        return self if self.orientation >= 0 else self[::-1]
+
+
 # To check whether a point x is inside the given convex polygon,
 # check that the turn x:pts[i]:pts[i+1] is left-handed for every
 # polygon edge pts[i]:pts[i+1].
@@ -101,7 +267,8 @@ def polygon_is_convex(poly):
 def point_inside_convex_polygon(poly, p):
     p1 = poly[-1]
     for p0 in poly:
-        if p == p0:
+        # Check both ends of the edge before checking the edge itself.
+        if p == p0 or p == p1:
             return 2
         if line_segment_intersect(p0, p1, p, p):
             return 1
@@ -163,7 +330,7 @@ def __cross_ray(x, y, x0, y0, x1, y1):
 def point_inside_polygon(poly, p):
     (x, y), (x1, y1), total = p, poly[-1], 0
     for (x0, y0) in poly:
-        if (x0, y0) == (x, y):
+        if (x0, y0) == (x, y) or (x1, y1) == (x, y):
             return 2
         if line_segment_intersect((x0, y0), (x1, y1), (x, y), (x, y)):
             return 1
@@ -173,22 +340,84 @@ def point_inside_polygon(poly, p):
     return 3 if total % 2 == 1 else 0
 
 
+# Counting the lattice points inside the polygon one point at a time
+# takes time proportional to its area. Instead, shoot the imaginary ray
+# of __cross_ray straight up from every lattice point at once: each edge
+# going left is crossed by the rays of the points below it in its range
+# of columns, and each edge going right takes one crossing away. These
+# counts add up to one for each point inside the polygon and to zero for
+# each point outside, and the sum over the columns of each edge has a
+# closed form that needs only logarithmic time to compute.
+
+# The sum of (a*i + b) // m for i in range(n), computed the same way as
+# the Euclidean gcd algorithm by swapping the roles of a and m.
+
+def __floor_sum(n, m, a, b):
+    total = 0
+    while True:
+        q, a = divmod(a, m)
+        total += q * n * (n - 1) // 2
+        q, b = divmod(b, m)
+        total += q * n
+        y_max = a * n + b
+        if y_max < m:
+            return total
+        n, b = divmod(y_max, m)
+        m, a = a, m
+
+
+# Whether the angle of vector u counterclockwise from the positive x-axis
+# is smaller than that of v, both angles measured within [0, 360).
+
+def __angle_less(u, v):
+    hu = 0 if u[1] > 0 or (u[1] == 0 and u[0] > 0) else 1
+    hv = 0 if v[1] > 0 or (v[1] == 0 and v[0] > 0) else 1
+    return hu < hv or (hu == hv and cross((0, 0), u, v) > 0)
+
+
+# Returns the tuple (interior, boundary) of the numbers of lattice points
+# strictly inside the polygon and on its edges. The lattice points on an
+# edge are counted with gcd, and the points on the boundary whose rays
+# got counted as if they were inside are subtracted at the end.
+
+def count_lattice_points(poly):
+    if polygon_area_twice(poly) < 0:
+        poly = poly[::-1]
+    n, boundary, total = len(poly), 0, 0
+    for i in range(n):
+        (x0, y0), (x1, y1) = poly[i - 1], poly[i]
+        g = gcd(x1 - x0, y1 - y0)
+        boundary += g
+        if x0 != x1:
+            # The points below the edge in its columns, with the edge
+            # oriented to go right. Lattice points on the edge itself
+            # are not below it, so the ceiling of the edge height counts.
+            (ax, ay), (bx, by) = sorted(((x0, y0), (x1, y1)))
+            w = bx - ax
+            below = __floor_sum(w, w, by - ay, ay * w + w - 1)
+            total += below if x1 < x0 else -below
+        # The points inside an edge going right or going down have the
+        # outside below them, but their rays still cross the edges above.
+        if x1 > x0 or (x1 == x0 and y1 < y0):
+            total -= g - 1
+    for i in range(n):
+        (px, py), (x, y), (nx, ny) = poly[i - 1], poly[i], poly[(i + 1) % n]
+        # The ray from a corner point has the same count as a point just
+        # below and to the right of it, except for the incident edges.
+        inside = __angle_less((px - x, py - y), (nx - x, ny - y))
+        if nx > x and ny >= y:
+            inside += 1
+        if px > x and py >= y:
+            inside -= 1
+        total -= inside
+    return total, boundary
+
+
 # https://en.wikipedia.org/wiki/Pick%27s_theorem
 
 def demonstrate_picks_theorem(poly):
     area_shoe = polygon_area_twice(poly)
-    inside, boundary = 0, 0
-    min_x = min((x for (x, y) in poly)) - 1
-    max_x = max((x for (x, y) in poly)) + 1
-    min_y = min((y for (x, y) in poly)) - 1
-    max_y = max((y for (x, y) in poly)) + 1
-    for x in range(min_x, max_x):
-        for y in range(min_y, max_y):
-            r = point_inside_polygon(poly, (x, y))
-            if r == 3:
-                inside += 1
-            elif r > 0:
-                boundary += 1
+    inside, boundary = count_lattice_points(poly)
     area_pick = 2*inside + boundary - 2
     print(f"shoe = {area_shoe}, pick = {area_pick}")
     return area_shoe == area_pick
@@ -199,35 +428,100 @@ def demonstrate_picks_theorem(poly):
 # the lowest y-coordinate point, and then uses the previous stack
 # algorithm to convexify the star polygon into the convex hull.
 
-def convex_hull(pts, clean_only=False):
-    pb = (min((x for (x, y) in pts)), min(y for (x, y) in pts))
-
-    def angle_cmp(p1, p2):
-        if p1 == pb:
-            return -1
-        elif p2 == pb:
-            return +1
-        c = -cross(pb, p1, p2)
-        if c != 0:
-            return c
-        (dx, dy) = (p2[0] - p1[0], p2[1] - p1[1])
-        if dy != 0:
-            return dy
-        elif dx != 0:
-            return -dx
-        else:
-            return 0
+# Sorting with a comparator function through cmp_to_key costs a Python
+# function call for every comparison. Instead, sort by a key that is
+# the slope dy/dx from the bottom left corner pb. Dividing two Python
+# integers is correctly rounded, so that the float slopes can never be
+# in the wrong order, but two different slopes can round to the same
+# float. Only those rare groups of points need the exact comparison with
+# Fractions. Among the points in the same direction from pb, the ones
+# on the bottom edge are sorted by ascending x, and the others by
+# descending y, which is what makes the star polygon well formed.
+
+def __star_sort(pts):
+    bx, by = min(x for (x, y) in pts), min(y for (x, y) in pts)
+
+    def slope(p):
+        dx, dy = p[0] - bx, p[1] - by
+        if dx == dy == 0:
+            return -1.0
+        return dy / dx if dx > 0 else float('inf')
+
+    def key(p):
+        s = slope(p)
+        return s, (p[0] if s == 0 else -p[1])
+
+    pts = sorted(pts, key=key)
+    result, i = [], 0
+    while i < len(pts):
+        j, s = i + 1, slope(pts[i])
+        while j < len(pts) and slope(pts[j]) == s:
+            j += 1
+        group = pts[i:j]
+        # Same float slope, but are the exact slopes also the same?
+        if 0 < s < float('inf') and len({Fraction(p[1] - by, p[0] - bx) for p in group}) > 1:
+            group.sort(key=lambda p: (Fraction(p[1] - by, p[0] - bx), -p[1]))
+        result.extend(group)
+        i = j
+    return result
 
-    pts.sort(key=cmp_to_key(angle_cmp))
-    return convexify(pts, clean_only)
 
+# Andrew's monotone chain algorithm sorts the points by their (x, y)
+# tuples, which Python compares at C speed, and then builds the lower
+# and upper halves of the hull with the same stack technique as
+# convexify. The hull is rotated to start from the lowest leftmost
+# point, the same corner where the star polygon starts. Degenerate
+# point sets with fewer than three hull points go through the star
+# polygon, so that the results are identical for them also.
+
+def __monotone_chain(pts):
+    pts = sorted(set(pts))
+
+    def half(seq):
+        result = []
+        for p in seq:
+            while len(result) > 1 and cross(result[-2], result[-1], p) <= 0:
+                result.pop()
+            result.append(p)
+        return result
+
+    hull = half(pts)[:-1] + half(reversed(pts))[:-1]
+    if len(hull) < 3:
+        return hull
+    start = min(range(len(hull)), key=lambda i: (hull[i][1], hull[i][0]))
+    return hull[start:] + hull[:start]
+
+
+# For NumPy arrays of points, first discard all points strictly inside
+# the quadrilateral of the four extreme points, as vector operations
+# on 64-bit integers. For random points, this leaves only a small
+# fraction of the points for the monotone chain. The cross products
+# must fit in 64 bits, which is checked from the coordinate ranges.
+
+def __hull_filter_np(pts):
+    pts = np.asarray(pts, dtype=np.int64)
+    span = int(max(np.ptp(pts[:, 0]), np.ptp(pts[:, 1])))
+    if 2 * span * span >= 2**63:
+        return [tuple(p) for p in pts.tolist()]
+    s, d = pts.sum(axis=1), pts[:, 0] - pts[:, 1]
+    quad = pts[[s.argmin(), d.argmax(), s.argmax(), d.argmin()]]
+    inside = np.ones(len(pts), dtype=bool)
+    for i in range(4):
+        (x1, y1), (x2, y2) = quad[i], quad[(i + 1) % 4]
+        c = (x2 - x1) * (pts[:, 1] - y1) - (y2 - y1) * (pts[:, 0] - x1)
+        inside &= c > 0
+    return [tuple(p) for p in pts[~inside].tolist()]
+
+
+def convex_hull(pts, clean_only=False):
+    if np is not None and isinstance(pts, np.ndarray):
+        pts = __hull_filter_np(pts) if not clean_only else [tuple(p) for p in pts.tolist()]
+    if not clean_only:
+        hull = __monotone_chain(pts)
+        if len(hull) > 2:
+            return hull
+    return convexify(__star_sort(pts), clean_only)
 
-# A "sweepline" algorithm that finds the two closest points in
-# the given list of points on the two-dimensional plane. Sort
-# the points by ascending x-coordinate. When comparing pairs of
-# points, each point needs to be compared only with the previous
-# points whose x-distance is less than equal to the current best
-# distance that we have found somewhere.
 
 # Squared Euclidean distance between two points on the plane.
 
@@ -235,15 +529,172 @@ def dist(p1, p2):
     return (p2[0] - p1[0])**2 + (p2[1] - p1[1])**2
 
 
-def closest_points(pts):
-    pts.sort()
-    best_d = dist(pts[0], pts[1])
+# Find the two closest points in the given list of points on the plane
+# with a randomized grid. The points are added in random order into a
+# grid of square cells whose side is more than the closest distance of
+# the points added so far, so that any point closer than that must lie in
+# one of the nine cells around the new point. If the new point finds a
+# closer neighbour, the grid is rebuilt with smaller cells. Since the new
+# point in position i is one of the closest pair of the first i points
+# with probability at most 2/i, the total expected work of rebuilding the
+# grid remains linear. Returns the closest pair of points, leaving the
+# original list untouched.
+
+def closest_pair(pts, rng=None):
+    if np is not None and isinstance(pts, np.ndarray):
+        return __closest_pair_np(pts, rng)
+    rng = rng if rng else random.Random(12345)
+    pts = list(pts)
+    rng.shuffle(pts)
+    best = (pts[0], pts[1])
+    best_d = dist(*best)
+
+    def build(m):
+        side = isqrt(best_d) + 1
+        grid = {}
+        for p in pts[:m]:
+            grid.setdefault((p[0] // side, p[1] // side), []).append(p)
+        return side, grid
+
+    side, grid = build(2)
     for i in range(2, len(pts)):
-        j = i - 1
-        while j >= 0 and (pts[i][0] - pts[j][0])**2 < best_d:
-            best_d = min(best_d, dist(pts[i], pts[j]))
-            j -= 1
-    return best_d
+        if best_d == 0:
+            break
+        p = pts[i]
+        cx, cy, improved = p[0] // side, p[1] // side, False
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for q in grid.get((cx + dx, cy + dy), ()):
+                    d = dist(p, q)
+                    if d < best_d:
+                        best, best_d, improved = (q, p), d, True
+        if improved:
+            side, grid = build(i + 1)
+        else:
+            grid.setdefault((cx, cy), []).append(p)
+    return best
+
+
+# The squared distance between the two closest points.
+
+def closest_points(pts):
+    return dist(*closest_pair(pts))
+
+
+# For millions of points given as a NumPy array of shape (n, 2), first
+# sieve out points in rounds, following the algorithm of Khuller and
+# Matias. Each round picks a random point and its nearest neighbour
+# distance d, and removes the points that are alone in their 3-by-3
+# block of grid cells of side d/3. Once nothing is left, the smallest d
+# seen is at most about three times the closest distance, so that in the
+# final grid with cells of side d, each cell contains only a constant
+# number of points. All candidate pairs inside neighbouring cells are
+# then checked as vector operations. The squared distances must fit in
+# 64 bits, which is checked from the coordinate ranges, and otherwise the
+# points go to the grid algorithm above. Duplicate points are found first
+# by sorting, since they would fill their cell with pairs to check.
+
+def __cell_keys(pts, side):
+    cells = pts // side
+    cells -= cells.min(axis=0) - 1
+    width = int(cells[:, 1].max()) + 2
+    return cells[:, 0] * width + cells[:, 1], width
+
+
+def __closest_pair_np(pts, rng=None):
+    pts = np.asarray(pts, dtype=np.int64)
+    span = max(int(pts[:, 0].max()) - int(pts[:, 0].min()), int(pts[:, 1].max()) - int(pts[:, 1].min()))
+    if 2 * span * span >= 2**63:
+        return closest_pair([tuple(p) for p in pts.tolist()])
+    order = np.lexsort((pts[:, 1], pts[:, 0]))
+    same = np.flatnonzero((pts[order[1:]] == pts[order[:-1]]).all(axis=1))
+    if len(same) > 0:
+        p = tuple(pts[order[same[0]]].tolist())
+        return p, p
+    rng = rng if rng else np.random.default_rng(12345)
+    alive, best_d = pts, None
+    while len(alive) > 1:
+        r = rng.integers(len(alive))
+        ds = ((alive - alive[r]) ** 2).sum(axis=1)
+        ds[r] = np.iinfo(np.int64).max
+        d = int(ds.min())
+        best_d = d if best_d is None else min(best_d, d)
+        side = isqrt(d) // 3
+        if side == 0:
+            break
+        keys, width = __cell_keys(alive, side)
+        # Sorted keys make the searches below much more cache friendly.
+        order = np.argsort(keys)
+        keys, alive = keys[order], alive[order]
+        uniq, counts = np.unique(keys, return_counts=True)
+        neighbours = np.zeros(len(alive), dtype=np.int64)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                k = keys + dx * width + dy
+                idx = np.minimum(np.searchsorted(uniq, k), len(uniq) - 1)
+                neighbours += np.where(uniq[idx] == k, counts[idx], 0)
+        alive = alive[neighbours > 1]
+    # The final pass over the neighbouring cells of the original points.
+    side = isqrt(best_d) + 1
+    keys, width = __cell_keys(pts, side)
+    order = np.argsort(keys, kind='stable')
+    keys, sorted_pts = keys[order], pts[order]
+    best_i, best_j = 0, 1
+    best_d = int(((pts[0] - pts[1]) ** 2).sum())
+    idx = np.arange(len(pts))
+    for (dx, dy) in ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1)):
+        k = keys + dx * width + dy
+        lo = np.searchsorted(keys, k, side='left')
+        hi = np.searchsorted(keys, k, side='right')
+        if dx == dy == 0:
+            lo = idx + 1  # Inside the same cell, each pair only once.
+        m = np.maximum(hi - lo, 0)
+        ii = np.repeat(idx, m)
+        # Positions inside each run of repeats, added to the run start.
+        offsets = np.arange(len(ii)) - np.repeat(np.cumsum(m) - m, m)
+        jj = np.repeat(lo, m) + offsets
+        if len(ii) > 0:
+            ds = ((sorted_pts[ii] - sorted_pts[jj]) ** 2).sum(axis=1)
+            a = int(ds.argmin())
+            if ds[a] < best_d:
+                best_d, best_i, best_j = int(ds[a]), order[ii[a]], order[jj[a]]
+    return tuple(pts[best_i].tolist()), tuple(pts[best_j].tolist())
+
+
+# The k closest pairs of points, in ascending order of distance, with
+# a sweepline that moves through the points in ascending order of x.
+# The points that are closer than the current k:th best distance to the
+# sweepline are kept sorted by y in the active list, so that only the
+# points inside the y-range of that distance need to be compared. The
+# k best pairs found so far are kept in a heap with the worst on top.
+
+def k_closest_pairs(pts, k):
+    if np is not None and isinstance(pts, np.ndarray):
+        pts = pts.tolist()
+    pts = sorted(tuple(p) for p in pts)
+    heap, active, left = [], [], 0
+    for (i, p) in enumerate(pts):
+        # Worst distance still accepted into the heap.
+        limit = -heap[0][0] if len(heap) == k else None
+        if limit is not None:
+            # Drop the points that are too far left of the sweepline.
+            while (p[0] - pts[left][0]) ** 2 > limit:
+                active.pop(bisect_left(active, (pts[left][1], left)))
+                left += 1
+            r = isqrt(limit)
+            lo = bisect_left(active, (p[1] - r, -1))
+            hi = bisect_right(active, (p[1] + r, len(pts)))
+            candidates = active[lo:hi]
+        else:
+            candidates = active
+        for (_, j) in candidates:
+            d = dist(p, pts[j])
+            if len(heap) < k:
+                heappush(heap, (-d, pts[j], p))
+            elif d < -heap[0][0]:
+                heappushpop(heap, (-d, pts[j], p))
+        insort(active, (p[1], i))
+    return [(q, p) for (_, q, p) in sorted(heap, key=lambda t: -t[0])]
 
 
 def __demo():
@@ -261,24 +712,59 @@ def __demo():
     while len(pts) < m:
         pts.add((random.randint(1, m), random.randint(1, m)))
     pts = list(pts)
-    print(f"Closest point distance is {closest_points(pts):.3f}.")
+    p1, p2 = closest_pair(pts)
+    print(f"Closest points are {p1} and {p2} with squared distance {dist(p1, p2)}.")
+    print(f"The five closest pairs are {k_closest_pairs(pts, 5)}.")
+    if np is not None:
+        # Coordinates too big for 64-bit squared distances, and duplicates.
+        big = [(x * 3 * 10**7, y * 3 * 10**7) for (x, y) in pts]
+        assert dist(*closest_pair(np.array(big))) == dist(*closest_pair(big))
+        assert closest_pair(np.array([(1, 2), (5, 5)] * 10**5)) == ((1, 2), (1, 2))
 
     star = convex_hull(pts, clean_only=True)
     print(f"The star polygon consists of {len(star)} points.")
 
     print(f"Let us demonstrate Pick's theorem:")
     demonstrate_picks_theorem(star)
+    poly = Polygon(star)
+    print(f"As a Polygon, it has bounding box {poly.bbox} and area {poly.area_twice / 2}.")
+    print(f"Its orientation is {poly.orientation}, and it is convex: {polygon_is_convex(poly)}.")
+    assert all(point_inside_polygon(poly, p) == point_inside_polygon(star, p) for p in pts)
+    if np is not None:
+        assert list(Polygon(np.array(star))) == star
+        try:
+            Polygon(np.array([[0.9, 0.9], [3.7, 0.2], [1.5, 2.8]]))
+            assert False
+        except TypeError:
+            pass
+    print("The functions of this module give the same answers for it.")
 
     hull = convexify(star)
     print(f"The convex hull consists of {len(hull)} points.")
     print(f"They are: {hull}")
     print(f"Pick's theorem still works:")
     demonstrate_picks_theorem(hull)
+    print("Also for the hull stretched to coordinates in the millions:")
+    demonstrate_picks_theorem([(12345 * x, 54321 * y) for (x, y) in hull])
 
     print("Let's verify the point in convex polygon shortcut.")
-    all_ok = True
-    for x in range(0, m):
-        for y in range(0, m):
+    grid = [(x, y) for x in range(0, m) for y in range(0, m)]
+    if np is not None:
+        # Imported here, since pointlocation itself imports this module.
+        from pointlocation import PolygonLocator, ConvexLocator
+        in1 = PolygonLocator(hull).locate_all(np.array(grid))
+        in2 = ConvexLocator(hull).locate_all(np.array(grid))
+        all_ok = bool((in1 == in2).all())
+        # Ground truth from the functions of this module for a sample.
+        for i in random.sample(range(len(grid)), 200):
+            if not (point_inside_polygon(hull, grid[i]) == point_inside_convex_polygon(hull, grid[i]) == in2[i]):
+                print(f"Discrepancy at {grid[i]} against point_inside_polygon.")
+                all_ok = False
+        for i in np.flatnonzero(in1 != in2):
+            print(f"Discrepancy at {grid[i]}: {in1[i]} {in2[i]}")
+    else:
+        all_ok = True
+        for (x, y) in grid:
             in1 = point_inside_polygon(hull, (x, y))
             in2 = point_inside_convex_polygon(hull, (x, y))
             if in1 != in2:
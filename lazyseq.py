@@ -0,0 +1,161 @@
+from array import array
+from collections import OrderedDict
+from itertools import count, islice
+from mmap import mmap, ACCESS_READ
+from tempfile import TemporaryFile
+
+from generators import primes, kolakoski
+from recursion import hof_q_gen
+
+# An infinite generator can only be walked forward, one element at the
+# time. A consumer that needs to look at the element in position 10**6
+# twice has to either regenerate the entire prefix, or keep its own list
+# of the elements generated so far. The class LazySeq wraps a generator
+# inside an object that can be indexed and sliced the same way as a list,
+# generating new elements only as far as needed and remembering all
+# elements that it has generated.
+
+# To save memory, the elements are stored in chunks of spacing elements,
+# each chunk a compact array of machine integers instead of a list of
+# pointers to individual int objects. Once the chunks in memory take up
+# more than the given budget of bytes, the least recently used chunks
+# are evicted to a spill file on the disk, from which they are read back
+# through a memory map when needed again. Since the elements never
+# change after having been generated, each chunk needs to be written to
+# the spill file only once.
+
+class LazySeq:
+
+    def __init__(self, seq, typecode='q', spacing=2**16, budget=2**26):
+        self.__seq = iter(seq)
+        self.__typecode = typecode
+        self.__spacing = spacing
+        self.__chunk_bytes = spacing * array(typecode).itemsize
+        self.__max_chunks = max(2, budget // self.__chunk_bytes)
+        # The chunks currently in memory, in the order of their latest use.
+        self.__chunks = OrderedDict()
+        # The indices of the chunks that have been written to spill file.
+        self.__spilled = set()
+        self.__spill, self.__map = None, None
+        self.__len = 0
+
+    # The length of the materialized prefix, not of the entire sequence.
+
+    def __len__(self):
+        return self.__len
+
+    # Generate new elements until the element in position i exists. The
+    # chunk being filled always remains in memory, since it is also the
+    # most recently used one.
+
+    def __materialize(self, i):
+        while self.__len <= i:
+            c = self.__len // self.__spacing
+            chunk = self.__chunks.get(c)
+            if chunk is None:
+                chunk = array(self.__typecode)
+                self.__chunks[c] = chunk
+                self.__evict()
+            room = self.__spacing - len(chunk)
+            before = len(chunk)
+            chunk.extend(islice(self.__seq, min(room, i + 1 - self.__len)))
+            if len(chunk) == before:
+                raise IndexError(f"Sequence ended before position {i}.")
+            self.__len += len(chunk) - before
+
+    # Move the least recently used chunks out of memory until the
+    # budget is respected again. The chunk that is still being filled
+    # is never evicted, so that only complete chunks are spilled.
+
+    def __evict(self):
+        tail = self.__len // self.__spacing
+        while len(self.__chunks) > self.__max_chunks:
+            c, chunk = self.__chunks.popitem(last=False)
+            if c == tail:
+                self.__chunks[c] = chunk
+                continue
+            if c not in self.__spilled:
+                if self.__spill is None:
+                    self.__spill = TemporaryFile()
+                self.__spill.seek(c * self.__chunk_bytes)
+                self.__spill.write(chunk.tobytes())
+                self.__spill.flush()
+                self.__spilled.add(c)
+                # The file has changed, so the old memory map is stale.
+                if self.__map is not None:
+                    self.__map.close()
+                    self.__map = None
+
+    # Find the chunk of the given index, reading it back from the spill
+    # file if it has been evicted.
+
+    def __chunk(self, c):
+        chunk = self.__chunks.get(c)
+        if chunk is not None:
+            self.__chunks.move_to_end(c)
+            return chunk
+        if self.__map is None:
+            self.__map = mmap(self.__spill.fileno(), 0, access=ACCESS_READ)
+        start = c * self.__chunk_bytes
+        chunk = array(self.__typecode)
+        chunk.frombytes(self.__map[start:start + self.__chunk_bytes])
+        self.__chunks[c] = chunk
+        self.__evict()
+        return chunk
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            step = 1 if i.step is None else i.step
+            if step == 0:
+                raise ValueError("Slice step cannot be zero.")
+            # Going forward needs an end, going backward needs a start.
+            start = (0 if step > 0 else None) if i.start is None else i.start
+            stop = (None if step > 0 else -1) if i.stop is None else i.stop
+            if start is None or stop is None or start < 0 or (stop < 0 and i.stop is not None):
+                raise IndexError("Slices of an infinite sequence must be finite.")
+            return [self[j] for j in range(start, stop, step)]
+        if i < 0:
+            raise IndexError("Negative indices are not allowed in an infinite sequence.")
+        self.__materialize(i)
+        return self.__chunk(i // self.__spacing)[i % self.__spacing]
+
+    def __iter__(self):
+        for i in count():
+            try:
+                yield self[i]
+            except IndexError:
+                return
+
+    # The memory map and the spill file should be released once this
+    # sequence is no longer needed.
+
+    def close(self):
+        if self.__map is not None:
+            self.__map.close()
+        if self.__spill is not None:
+            self.__spill.close()
+        self.__map, self.__spill = None, None
+
+
+def __demo():
+    # A tiny budget to force chunks to be spilled to disk.
+    ps = LazySeq(primes(), spacing=1000, budget=32000)
+    print(f"The prime in position 10**5 is {ps[10**5]}.")
+    print(f"Materialized prefix now has {len(ps)} primes.")
+    print(f"The first ten primes are {ps[:10]}.")
+    print(f"Every 10000th prime up to position 10**5 is {ps[0:10**5:10**4]}.")
+    assert ps[:1000] == list(islice(primes(), 1000))
+    assert ps[10:0:-1] == ps[:11][10:0:-1] and ps[10::-3] == ps[:11][10::-3]
+    ps.close()
+
+    qs = LazySeq(hof_q_gen())
+    print(f"Hofstadter Q-values around position 10**6 are {qs[10**6:10**6 + 5]}.")
+    assert qs[:500] == list(islice(hof_q_gen(), 500))
+
+    # Kolakoski elements fit in a single byte each.
+    ks = LazySeq(kolakoski(), typecode='B')
+    print(f"Kolakoski elements from position 10**5 are {ks[10**5:10**5 + 20]}.")
+
+
+if __name__ == "__main__":
+    __demo()
@@ -0,0 +1,143 @@
+from itertools import islice
+from math import isqrt
+
+from generators import theons_ladder_pairs
+
+# The generators demo ends by wondering what other mysteries of number
+# theory hide inside Theon's ladder. For n = 2, the ladder produces the
+# pairs (a, b) that satisfy a*a - 2*b*b == +1 or -1. The equations of the
+# form x*x - n*y*y == +1 for integers x and y are known as Pell's equation,
+# and have infinitely many solutions whenever n is not a perfect square.
+# Instead of scanning the ladder term by term in hope of stumbling upon
+# these solutions, they can be found directly with continued fractions.
+# https://en.wikipedia.org/wiki/Pell%27s_equation
+
+# The continued fraction of the square root of n is periodic, and its
+# terms can be computed with nothing but integer arithmetic. Returns the
+# integer part a0 and the list of terms in one full period.
+
+def sqrt_continued_fraction(n):
+    a0 = isqrt(n)
+    if a0 * a0 == n:
+        raise ValueError(f"{n} is a perfect square.")
+    m, d, a, period = 0, 1, a0, []
+    # The period always ends with the term 2*a0.
+    while a != 2 * a0:
+        m = d * a - m
+        d = (n - m * m) // d
+        a = (a0 + m) // d
+        period.append(a)
+    return a0, period
+
+
+# The convergents of the continued fraction approximate the square root of
+# n, and the convergent just before the end of the first period solves
+# x*x - n*y*y == (-1)**k where k is the length of the period. If the
+# period has odd length, this fundamental solution of the negative
+# equation composed with itself gives the fundamental solution of the
+# positive equation. If the period has even length, the negative
+# equation has no solutions, and this function returns None for it.
+
+def pell_fundamental(n, sign=+1):
+    a0, period = sqrt_continued_fraction(n)
+    (p0, p1), (q0, q1) = (1, a0), (0, 1)
+    for a in period[:-1]:
+        p0, p1 = p1, a * p1 + p0
+        q0, q1 = q1, a * q1 + q0
+    odd = len(period) % 2 == 1
+    if sign == -1:
+        return (p1, q1) if odd else None
+    return pell_compose(n, (p1, q1), (p1, q1)) if odd else (p1, q1)
+
+
+# Two solutions are composed by multiplying the numbers x1 + y1*sqrt(n)
+# and x2 + y2*sqrt(n), keeping the rational and irrational parts separate.
+# Since the norm x*x - n*y*y is multiplicative, composing two solutions
+# of the positive equation produces another solution of it.
+
+def pell_compose(n, s1, s2):
+    (x1, y1), (x2, y2) = s1, s2
+    return x1 * x2 + n * y1 * y2, x1 * y2 + x2 * y1
+
+
+# The k:th solution (counting from one) of x*x - n*y*y == sign, computed
+# with repeated squaring the same way as in binary_power of recursion.py.
+# The solutions of the negative equation are the odd powers of its
+# fundamental solution.
+
+def pell_solution(n, k, sign=+1):
+    base = pell_fundamental(n, sign)
+    if base is None:
+        return None
+    if sign == -1:
+        k, result = k - 1, base
+        base = pell_compose(n, base, base)
+    else:
+        result = (1, 0)
+    while k > 0:
+        if k % 2 == 1:
+            result = pell_compose(n, result, base)
+        base = pell_compose(n, base, base)
+        k = k // 2
+    return result
+
+
+# All solutions of the equation in ascending order, each next solution
+# produced from the previous one by a single composition.
+
+def pell_solutions(n, sign=+1):
+    base = pell_fundamental(n, sign)
+    if base is None:
+        return
+    step = base if sign == +1 else pell_compose(n, base, base)
+    curr = base
+    while True:
+        yield curr
+        curr = pell_compose(n, curr, step)
+
+
+# Batch mode to find the fundamental solutions for many values of n at
+# once, skipping the perfect squares. Returns a dictionary that maps each
+# n to its fundamental solution, or None if the equation has no solution.
+
+def pell_batch(ns, sign=+1):
+    result = {}
+    for n in ns:
+        s = isqrt(n)
+        if s * s != n:
+            result[n] = pell_fundamental(n, sign)
+    return result
+
+
+def __demo():
+    print("The fundamental solutions of x*x - n*y*y == 1 for n up to 30:")
+    for (n, (x, y)) in pell_batch(range(2, 31)).items():
+        assert x * x - n * y * y == 1
+        print(f"n = {n}: x = {x}, y = {y}")
+
+    print("\nThe values of n up to 100 for which x*x - n*y*y == -1 is solvable:")
+    negs = [n for (n, sol) in pell_batch(range(2, 101), -1).items() if sol is not None]
+    print(negs)
+
+    x, y = pell_fundamental(61)
+    print(f"\nFor n = 61, the smallest solution is x = {x}, y = {y}.")
+
+    x, y = pell_solution(2, 1000)
+    assert x * x - 2 * y * y == 1
+    print(f"The 1000th solution for n = 2 has {len(str(x))} digits.")
+
+    # The Theon's ladder for n = 2 alternates between the solutions of the
+    # negative and positive Pell equations.
+    ladder = list(islice(theons_ladder_pairs(2), 20))
+    pells = sorted(list(islice(pell_solutions(2), 10)) + list(islice(pell_solutions(2, -1), 10)))
+    assert ladder == pells
+    print("For n = 2, Theon's ladder produces exactly the solutions of x*x - 2*y*y == +1 or -1.")
+
+    print("\nFor other n, the ladder terms that solve x*x - n*y*y == 1 are:")
+    for n in [3, 5, 6, 7, 10]:
+        hits = [(a, b) for (a, b) in islice(theons_ladder_pairs(n), 30) if a * a - n * b * b == 1]
+        print(f"n = {n}: {hits[:4]}, first Pell solutions {list(islice(pell_solutions(n), 4))}")
+
+
+if __name__ == "__main__":
+    __demo()
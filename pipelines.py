@@ -0,0 +1,154 @@
+from collections import deque
+from itertools import islice, repeat, chain
+from time import perf_counter
+
+from generators import collatz, every_kth, stutter
+
+# The iterator decorators every_kth and stutter in generators.py are
+# handwritten generators, so that every element that passes through
+# them costs a couple of rounds of the Python interpreter loop. The
+# same decorators can be expressed as compositions of the functions
+# in itertools, whose loops are written in C and therefore run at the
+# speed of the machine instead of the speed of the interpreter.
+
+# Let through every k:th element and discard the rest.
+
+def every_kth_fast(seq, k):
+    return islice(seq, k-1, None, k)
+
+
+# Duplicate each element k times. The map creates the iterator
+# repeat(x, k) for each element x, and these are then chained.
+
+def stutter_fast(seq, k):
+    return chain.from_iterable(map(repeat, seq, repeat(k)))
+
+
+# A pipeline of decorators can be described as a list of stages, each
+# stage a pair of the operation name and its parameter. Before the
+# pipeline is applied to the actual sequence, adjacent stages that
+# can be combined into one are fused. For example, stutter k followed
+# by every_kth k is the identity, so both of these stages disappear
+# and the original sequence goes through untouched.
+
+class Pipeline:
+
+    __ops = {
+        'every_kth': every_kth_fast,
+        'stutter': stutter_fast,
+        'take': lambda seq, n: islice(seq, n),
+        'skip': lambda seq, n: islice(seq, n, None),
+    }
+
+    def __init__(self, stages=()):
+        self.__stages = tuple(stages)
+
+    # Each method returns a new pipeline with one more stage, so that
+    # these calls can be chained in the fluent style.
+
+    def every_kth(self, k):
+        return Pipeline(self.__stages + (('every_kth', k),))
+
+    def stutter(self, k):
+        return Pipeline(self.__stages + (('stutter', k),))
+
+    def take(self, n):
+        return Pipeline(self.__stages + (('take', n),))
+
+    def skip(self, n):
+        return Pipeline(self.__stages + (('skip', n),))
+
+    # Attempt to fuse two adjacent stages into one. Returns the list
+    # of zero or one stages that do the same job, or None if these
+    # two stages cannot be fused.
+
+    @staticmethod
+    def __fuse(first, second):
+        (op1, k1), (op2, k2) = first, second
+        if op1 == op2 and op1 in ('every_kth', 'stutter'):
+            return [(op1, k1 * k2)]
+        if op1 == op2 == 'skip':
+            return [('skip', k1 + k2)]
+        if op1 == op2 == 'take':
+            return [('take', min(k1, k2))]
+        if op1 == 'stutter' and op2 == 'every_kth':
+            # Picks positions k2-1, 2*k2-1, ... of the stuttered sequence,
+            # that is, the elements in positions (j*k2-1) // k1.
+            if k2 % k1 == 0:
+                return [('every_kth', k2 // k1)] if k2 > k1 else []
+            if k1 % k2 == 0:
+                return [('stutter', k1 // k2)]
+        return None
+
+    # Fuse stages with a stack, the same way as convexify in geometry.py
+    # eliminates the right turns from its polygon. Stages with parameter
+    # one do nothing and are dropped outright.
+
+    def stages(self):
+        result = []
+        for stage in self.__stages:
+            if stage[0] in ('every_kth', 'stutter') and stage[1] == 1:
+                continue
+            result.append(stage)
+            while len(result) > 1:
+                fused = Pipeline.__fuse(result[-2], result[-1])
+                if fused is None:
+                    break
+                result[-2:] = fused
+        return result
+
+    # Apply the fused pipeline to the given iterable.
+
+    def __call__(self, seq):
+        seq = iter(seq)
+        for (op, k) in self.stages():
+            seq = Pipeline.__ops[op](seq, k)
+        return seq
+
+    def __repr__(self):
+        return " | ".join(f"{op}({k})" for (op, k) in self.__stages) or "identity"
+
+
+# Measure how many elements per second each way of decorating produces.
+# A deque of maximum length zero consumes an iterator at C speed, so that
+# the measurement loop itself does not dominate the results.
+
+def __throughput(make, n):
+    start = perf_counter()
+    deque(islice(make(), n), maxlen=0)
+    return n / (perf_counter() - start)
+
+
+def __demo():
+    p = Pipeline().stutter(3).every_kth(3)
+    print(f"Pipeline {p} fuses into stages {p.stages()}.")
+    print(list(p(collatz(27)))[:20])
+
+    p = Pipeline().stutter(2).stutter(3).every_kth(2).skip(5).skip(5).take(10)
+    print(f"Pipeline {p} fuses into stages {p.stages()}.")
+    print(list(p(range(100))))
+
+    # Gold testing against the original generators.
+    for k1 in range(1, 5):
+        for k2 in range(1, 5):
+            expected = list(every_kth(stutter(range(100), k1), k2))
+            assert list(Pipeline().stutter(k1).every_kth(k2)(range(100))) == expected
+            expected = list(stutter(every_kth(range(100), k1), k2))
+            assert list(Pipeline().every_kth(k1).stutter(k2)(range(100))) == expected
+
+    n, k = 10**6, 3
+    print(f"\nThroughput in elements per second, with {n} elements:")
+    for (name, make) in [
+        ("every_kth(stutter) generators", lambda: every_kth(stutter(range(n), k), k)),
+        ("every_kth_fast(stutter_fast)", lambda: every_kth_fast(stutter_fast(range(n), k), k)),
+        ("fused pipeline", lambda: Pipeline().stutter(k).every_kth(k)(range(n))),
+        ("stutter generator", lambda: stutter(range(n), k)),
+        ("stutter_fast", lambda: stutter_fast(range(n), k)),
+        ("every_kth generator", lambda: every_kth(range(n), k)),
+        ("every_kth_fast", lambda: every_kth_fast(range(n), k)),
+    ]:
+        print(f"{name:>30}: {__throughput(make, n):14,.0f}")
+
+
+if __name__ == "__main__":
+    __demo()
@@ -0,0 +1,305 @@
+import random
+from bisect import bisect_left, bisect_right
+from fractions import Fraction
+
+from geometry import cross, orientations, point_inside_polygon, point_inside_convex_polygon, convex_hull, \
+    convexify, polygon_area_twice
+
+# NumPy is needed only for answering entire arrays of queries at once.
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# The function point_inside_polygon of geometry.py loops through every
+# edge of the polygon for each query point. When the same polygon is
+# asked about millions of points, it pays to first preprocess the
+# polygon into a data structure that answers each query in logarithmic
+# time. These locators return the same answers as the functions in
+# geometry.py: 0 if the point is outside the polygon, 1 if it lies on
+# the edge, 2 if it is a corner point, and 3 if it lies properly inside.
+
+# Slab decomposition cuts the plane into vertical slabs with lines that
+# go through every corner point of the polygon. No corner points lie
+# strictly inside any slab, so the edges that pass through a slab never
+# cross each other there, and can be sorted from bottom to top. Within
+# its slab, the query point is inside the polygon if and only if there
+# is an odd number of edges below it, found with binary search.
+
+# The slabs can take up quadratic space in the worst case, but for the
+# polygons of the geometry.py demo, most edges span only a few slabs.
+
+class PolygonLocator:
+
+    def __init__(self, poly):
+        self.__vertices = set(poly)
+        self.__xs = sorted({x for (x, y) in poly})
+        m = len(self.__xs)
+        self.__slabs = [[] for _ in range(m - 1)]
+        # Vertical edges for each x-coordinate, as sorted (ylo, yhi) pairs.
+        self.__verticals = {}
+        prev = poly[-1]
+        for p in poly:
+            (ax, ay), (bx, by) = sorted((prev, p))
+            if ax == bx:
+                j = bisect_left(self.__xs, ax)
+                self.__verticals.setdefault(j, []).append((ay, by))
+            else:
+                for j in range(bisect_left(self.__xs, ax), bisect_left(self.__xs, bx)):
+                    self.__slabs[j].append(((ax, ay), (bx, by)))
+            prev = p
+        for (j, slab) in enumerate(self.__slabs):
+            # Sort the edges by their exact height at the middle of the slab.
+            xm = Fraction(self.__xs[j] + self.__xs[j+1], 2)
+            slab.sort(key=lambda e: e[0][1] + (e[1][1] - e[0][1]) * (xm - e[0][0]) / (e[1][0] - e[0][0]))
+        for intervals in self.__verticals.values():
+            intervals.sort()
+        self.__arrays = None
+
+    # Count how many edges of the slab lie strictly below the point p.
+    # Since the edges are sorted, the point is above some prefix of them.
+
+    @staticmethod
+    def __count_below(slab, p):
+        lo, hi = 0, len(slab)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if cross(slab[mid][0], slab[mid][1], p) > 0:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __on_vertical(self, j, y):
+        intervals = self.__verticals.get(j, [])
+        t = bisect_right(intervals, (y, float('inf')))
+        return t > 0 and intervals[t-1][1] >= y
+
+    # A point on the vertical line through a corner point is either on a
+    # vertical edge, on some edge that crosses this line, or has the same
+    # answer as the points just to the right of it. Therefore the slab to
+    # the right of the line answers the query in all these cases.
+
+    def locate(self, p):
+        (x, y) = p
+        if p in self.__vertices:
+            return 2
+        j = bisect_right(self.__xs, x) - 1
+        if j < 0:
+            return 0
+        if self.__xs[j] == x and self.__on_vertical(j, y):
+            return 1
+        if j == len(self.__xs) - 1:
+            return 0
+        slab = self.__slabs[j]
+        k = PolygonLocator.__count_below(slab, p)
+        if k < len(slab) and cross(slab[k][0], slab[k][1], p) == 0:
+            return 1
+        return 3 if k % 2 == 1 else 0
+
+    # Flatten the slabs into NumPy arrays, so that the binary searches
+    # for an entire array of query points can proceed in lockstep, each
+    # round of binary search a handful of vector operations.
+
+    def __flatten(self):
+        if self.__arrays is None:
+            edges = [e for slab in self.__slabs for e in slab]
+            counts = np.array([len(slab) for slab in self.__slabs] + [0], dtype=np.int64)
+            vs = [self.__verticals.get(j, []) for j in range(len(self.__xs))]
+            vcounts = np.array([len(v) for v in vs], dtype=np.int64)
+            self.__arrays = (
+                np.array(self.__xs),
+                np.array([a + b for (a, b) in edges]).reshape(-1, 4),
+                np.cumsum(counts) - counts, counts,
+                np.array([iv for v in vs for iv in v]).reshape(-1, 2),
+                np.cumsum(vcounts) - vcounts, vcounts,
+                np.array(sorted(self.__vertices)).reshape(-1, 2)
+            )
+        return self.__arrays
+
+    # Answer an array of query points of shape (n, 2) in one call. The
+    # points can have float coordinates, or integers of any size, since
+    # the turns are computed with the exact orientations of geometry.py.
+
+    def locate_all(self, pts):
+        pts = np.asarray(pts)
+        if len(pts) == 0:
+            return np.zeros(0, dtype=np.int8)
+        xs, edges, start, count, verts, vstart, vcount, corners = self.__flatten()
+        qx, qy = pts[:, 0], pts[:, 1]
+        j = np.searchsorted(xs, qx, side='right') - 1
+        jc = np.maximum(j, 0)
+        on_line = (j >= 0) & (xs[jc] == qx)
+        in_slab = (j >= 0) & (j < len(xs) - 1)
+
+        # The vertical edges on the line through the query point.
+        vs, vc = vstart[jc], np.where(on_line, vcount[jc], 0)
+        t = batch_count(vs, vc, lambda idx, e: verts[e, 0] <= qy[idx])
+        vi = np.maximum(vs + t - 1, 0)
+        on_edge = (t > 0) & (verts[vi, 1] >= qy) if len(verts) > 0 else np.zeros(len(pts), dtype=bool)
+
+        # The edges of the slab below the query point.
+        es, ec = start[jc], np.where(in_slab, count[jc], 0)
+
+        def above(idx, e):
+            return batch_cross(edges[e], qx[idx], qy[idx]) > 0
+        k = batch_count(es, ec, above)
+        hit = k < ec
+        ei = np.minimum(es + k, max(len(edges) - 1, 0))
+        if len(edges) > 0:
+            on_edge |= hit & (batch_cross(edges[ei], qx, qy) == 0)
+        result = np.where(in_slab & (k % 2 == 1), 3, 0).astype(np.int8)
+        result[on_edge] = 1
+        result[is_corner(pts, corners)] = 2
+        return result
+
+
+# A convex polygon does not need slabs, since every corner point is
+# visible from its first corner v0. The diagonals from v0 cut the polygon
+# into a fan of triangles, and the turns v0:v[i]:p are left-handed for
+# some prefix of these diagonals, found with binary search. After that,
+# only the outer edge of that one triangle needs to be checked.
+
+class ConvexLocator:
+
+    def __init__(self, poly):
+        # Orient the polygon counterclockwise, same as point_inside_convex_polygon.
+        self.__poly = list(poly) if polygon_area_twice(poly) >= 0 else list(reversed(poly))
+        self.__vertices = set(poly)
+        self.__arrays = None
+
+    def locate(self, p):
+        if p in self.__vertices:
+            return 2
+        poly, n = self.__poly, len(self.__poly)
+        v0 = poly[0]
+        c1, c2 = cross(v0, poly[1], p), cross(v0, poly[-1], p)
+        if c1 < 0 or c2 > 0:
+            return 0
+        lo, hi = 1, n - 2
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if cross(v0, poly[mid], p) >= 0:
+                lo = mid
+            else:
+                hi = mid - 1
+        c = cross(poly[lo], poly[lo+1], p)
+        if c < 0:
+            return 0
+        # The lines of the two edges at v0 touch the polygon only at its boundary.
+        return 1 if c == 0 or c1 == 0 or c2 == 0 else 3
+
+    def __flatten(self):
+        if self.__arrays is None:
+            poly = np.array(self.__poly)
+            fan = np.concatenate((np.broadcast_to(poly[0], (len(poly) - 2, 2)), poly[1:-1]), axis=1)
+            rim = np.concatenate((poly[1:-1], poly[2:]), axis=1)
+            last = np.concatenate((poly[0], poly[-1])).reshape(1, 4)
+            self.__arrays = (fan, rim, last, np.array(sorted(self.__vertices)).reshape(-1, 2))
+        return self.__arrays
+
+    def locate_all(self, pts):
+        pts = np.asarray(pts)
+        if len(pts) == 0:
+            return np.zeros(0, dtype=np.int8)
+        fan, rim, last, corners = self.__flatten()
+        qx, qy = pts[:, 0], pts[:, 1]
+        # The single edge rows broadcast against all query points.
+        c1, c2 = batch_cross(fan[:1], qx, qy), batch_cross(last, qx, qy)
+        in_range = (c1 >= 0) & (c2 <= 0)
+        # Diagonals v[1], ..., v[n-2], of which at least the first is left of p.
+        count = np.where(in_range, len(fan), 0)
+
+        def left(idx, e):
+            return batch_cross(fan[e], qx[idx], qy[idx]) >= 0
+        k = batch_count(np.zeros(len(pts), dtype=np.int64), count, left)
+        c = batch_cross(rim[np.maximum(k - 1, 0)], qx, qy)
+        result = np.where(in_range & (c > 0), 3, 0).astype(np.int8)
+        result[in_range & ((c == 0) | ((c > 0) & ((c1 == 0) | (c2 == 0))))] = 1
+        result[is_corner(pts, corners)] = 2
+        return result
+
+
+# Helper functions for the vectorized queries, also used by other modules.
+
+# The signs of the cross products of edges (ax, ay, bx, by) and the query
+# points, the same as the signs of the function cross of geometry.py.
+
+def batch_cross(edges, qx, qy):
+    return orientations(edges[:, :2], edges[:, 2:], np.stack((qx, qy), axis=-1))
+
+
+# Binary search for all queries in lockstep. For each query i, count the
+# positions t in range(count[i]) for which pred holds for the element
+# start[i] + t, assuming that pred holds for some prefix of these.
+
+def batch_count(start, count, pred):
+    lo, hi = np.zeros(len(count), dtype=np.int64), count.astype(np.int64)
+    active = np.flatnonzero(lo < hi)
+    while len(active) > 0:
+        mid = (lo[active] + hi[active]) // 2
+        ok = pred(active, start[active] + mid)
+        lo[active] = np.where(ok, mid + 1, lo[active])
+        hi[active] = np.where(ok, hi[active], mid)
+        active = active[lo[active] < hi[active]]
+    return lo
+
+
+# Which of the query points are among the given corner points. Points
+# whose coordinates are exact as floats pack into single complex numbers,
+# so that np.isin can compare whole rows. Others are looked up in a set.
+
+def is_corner(pts, corners):
+    pts, corners = np.asarray(pts).reshape(-1, 2), np.asarray(corners).reshape(-1, 2)
+    if all(a.dtype.kind == 'f' or (a.dtype.kind in 'iu' and (a.size == 0 or int(np.abs(a).max()) <= 2**53))
+           for a in (pts, corners)):
+        def keys(a):
+            a = a.astype(np.float64)
+            return a[:, 0] + 1j * a[:, 1]
+        return np.isin(keys(pts), keys(corners))
+    cs = set(map(tuple, corners.tolist()))
+    return np.array([p in cs for p in map(tuple, pts.tolist())], dtype=bool)
+
+
+def __demo():
+    rng = random.Random(12345)
+    m, pts = 100, set()
+    pts.add((0, 0))
+    while len(pts) < m:
+        pts.add((rng.randint(1, m), rng.randint(1, m)))
+    star = convex_hull(list(pts), clean_only=True)
+    print(f"Preprocessing a star polygon with {len(star)} corners.")
+    loc = PolygonLocator(star)
+    grid = [(x, y) for x in range(-2, m + 3) for y in range(-2, m + 3)]
+    expected = [point_inside_polygon(star, p) for p in grid]
+    assert [loc.locate(p) for p in grid] == expected
+    print(f"Single queries agree with point_inside_polygon for {len(grid)} points.")
+    if np is not None:
+        assert loc.locate_all(np.array(grid)).tolist() == expected
+        print("Batch queries agree with point_inside_polygon.")
+        big = [(x * 10**20, y * 10**20) for (x, y) in star]
+        assert PolygonLocator(big).locate_all(np.array(big, dtype=object)).tolist() == [2] * len(big)
+        print("Batch queries work exactly for huge integer coordinates.")
+        fs = [(x + 0.5, y - 0.25) for (x, y) in grid]
+        # These particular floats happen to keep point_inside_polygon exact.
+        expected = [point_inside_polygon(star, p) for p in fs]
+        assert loc.locate_all(np.array(fs)).tolist() == expected
+        print("Batch queries work exactly for float coordinates.")
+
+    hull = convexify(star)
+    print(f"Preprocessing its convex hull with {len(hull)} corners.")
+    loc = ConvexLocator(hull)
+    expected = [point_inside_convex_polygon(hull, p) for p in grid]
+    assert [loc.locate(p) for p in grid] == expected
+    print("Single queries agree with point_inside_convex_polygon.")
+    if np is not None:
+        assert loc.locate_all(np.array(grid)).tolist() == expected
+        print("Batch queries agree with point_inside_convex_polygon.")
+        pts = np.random.default_rng(12345).integers(-m, 2 * m, size=(10**6, 2))
+        inside = np.count_nonzero(loc.locate_all(pts) == 3)
+        print(f"Of {len(pts)} random points, {inside} are inside the hull.")
+
+
+if __name__ == "__main__":
+    __demo()
@@ -0,0 +1,221 @@
+from itertools import takewhile
+from math import gcd, isqrt
+from random import Random
+
+from generators import primes
+
+# NumPy is needed only by the batched functions at the end.
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# The primes generator and the integer functions of mathproblems.py
+# find out whether n is prime by trial division, which takes up to the
+# square root of n steps. For numbers with twenty digits, that is not
+# going to happen in our lifetimes. Fortunately, number theory offers
+# much faster ways to test primality without having to find the factors.
+
+# Small primes to pre-screen the inputs with quick trial division before
+# the heavier tests. Most composite numbers have some small factor.
+
+__small_primes = list(takewhile(lambda p: p < 1000, primes()))
+
+# The Miller-Rabin test with the thirteen prime bases up to 41 is proven
+# to give the correct answer for every n less than 3.3 * 10**24, which
+# covers all 64-bit integers with plenty of room to spare. Without the
+# base 41, the limit would drop to 318665857834031151167461, itself a
+# strong pseudoprime to all twelve smaller bases.
+
+__witnesses = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+__deterministic_limit = 3317044064679887385961981
+
+
+# Fermat's little theorem says that a**(n-1) % n == 1 for every prime n.
+# The square roots of one modulo a prime are only 1 and -1, so repeatedly
+# taking the square root of a**(n-1) starting from a**d, with n - 1 = d *
+# 2**s for odd d, must lead to -1 before reaching 1. A composite number
+# that passes this test for base a is called a strong probable prime.
+
+def is_strong_probable_prime(n, a):
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d, s = d // 2, s + 1
+    x = pow(a, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    for _ in range(s - 1):
+        x = x * x % n
+        if x == n - 1:
+            return True
+    return False
+
+
+# Deterministic below the limit of the witnesses. Above that limit, each
+# additional random base that a composite number passes has a chance of
+# at most one in four, so the answer True is wrong with the probability
+# of at most 4**(-rounds), less than the chance of a cosmic ray flipping
+# a bit in the computer memory during this computation.
+
+def is_prime(n, rounds=20, rng=None):
+    if n < 2:
+        return False
+    for p in __small_primes:
+        if n % p == 0:
+            return n == p
+    if n < __small_primes[-1] ** 2:
+        return True
+    if not all(is_strong_probable_prime(n, a) for a in __witnesses):
+        return False
+    if n < __deterministic_limit:
+        return True
+    rng = rng if rng else Random(12345)
+    return all(is_strong_probable_prime(n, rng.randint(2, n - 2)) for _ in range(rounds))
+
+
+# Pollard's rho algorithm, with Brent's improvements. The sequence x, f(x),
+# f(f(x)), ... where f(x) = (x*x + c) % n must eventually enter a cycle,
+# and modulo an unknown prime factor p of n, it does so after about the
+# square root of p steps, by the birthday paradox. Whenever two elements
+# of the sequence agree modulo p, their difference has a common factor
+# with n. Brent finds the cycle by comparing each element to the saved
+# element whose position is the latest power of two, and accumulates
+# the products of m differences to take only one gcd for all of them.
+
+def __brent(n, rng):
+    if n % 2 == 0:
+        return 2
+    while True:
+        y, c, m = rng.randint(1, n - 1), rng.randint(1, n - 1), 128
+        g, r, q = 1, 1, 1
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                for _ in range(min(m, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = gcd(q, n)
+                k += m
+            r *= 2
+        if g == n:
+            # Went too far in one batch, so retrace one step at the time.
+            g = 1
+            while g == 1:
+                ys = (ys * ys + c) % n
+                g = gcd(abs(x - ys), n)
+        if g != n:
+            return g
+        # Unlucky choice of c, so try again with another one.
+
+
+# The list of prime factors of n in ascending order, with multiplicity.
+# Zero and negative numbers have no such factorization.
+
+def factorize(n, rng=None):
+    if n < 1:
+        raise ValueError(f"Can't factorize {n}; it must be positive.")
+    rng = rng if rng else Random(12345)
+    result = []
+    for p in __small_primes:
+        while n % p == 0:
+            result.append(p)
+            n //= p
+    stack = [n] if n > 1 else []
+    while stack:
+        m = stack.pop()
+        if is_prime(m):
+            result.append(m)
+        else:
+            # Perfect squares would trip up the rho, so handle them first.
+            s = isqrt(m)
+            d = s if s * s == m else __brent(m, rng)
+            stack.append(d)
+            stack.append(m // d)
+    return sorted(result)
+
+
+# The batched versions first do the trial division by small primes for
+# the entire array at once as NumPy vector operations. Only the numbers
+# that survive this screening go through the heavier tests one at the
+# time, since the modular arithmetic of 64-bit numbers would overflow
+# the 64-bit integers of NumPy.
+
+def is_prime_batch(ns):
+    ns = np.asarray(ns, dtype=np.int64)
+    result = ns >= 2
+    undecided = result.copy()
+    for p in __small_primes:
+        divisible = undecided & (ns % p == 0)
+        result[divisible] = ns[divisible] == p
+        undecided &= ~divisible
+    # Survivors below the square of the largest small prime are primes.
+    undecided &= ns >= __small_primes[-1] ** 2
+    for i in np.flatnonzero(undecided):
+        result[i] = is_prime(int(ns[i]))
+    return result
+
+
+def factorize_batch(ns, rng=None):
+    ns = np.asarray(ns, dtype=np.int64)
+    if np.any(ns < 1):
+        raise ValueError(f"Can't factorize {ns[ns < 1][0]}; it must be positive.")
+    remaining = ns.copy()
+    factors = [[] for _ in range(len(ns))]
+    for p in __small_primes:
+        while True:
+            divisible = np.flatnonzero((remaining % p == 0) & (remaining > 1))
+            if len(divisible) == 0:
+                break
+            for i in divisible:
+                factors[i].append(p)
+            remaining[divisible] //= p
+    for i in np.flatnonzero(remaining > 1):
+        factors[i].extend(factorize(int(remaining[i]), rng))
+    return factors
+
+
+def __demo():
+    # Gold testing against the primes generator.
+    ps = set(takewhile(lambda p: p < 10**5, primes()))
+    assert all(is_prime(n) == (n in ps) for n in range(10**5))
+    print("is_prime agrees with the primes generator below 10**5.")
+
+    for n in [2**61 - 1, 2**64 - 59, 2**89 - 1, 2**67 - 1, 561, 3215031751, 10**18 + 9]:
+        print(f"{n} is {'prime' if is_prime(n) else 'composite'}.")
+    # Strong pseudoprime to all prime bases up to 37.
+    assert not is_prime(318665857834031151167461)
+
+    for n in [2**67 - 1, 10**18 + 1, 600851475143, 2**64 - 1, 1234567891011121314,
+              318665857834031151167461]:
+        fs = factorize(n)
+        print(f"{n} = {' * '.join(str(f) for f in fs)}")
+        product = 1
+        for f in fs:
+            product *= f
+        assert product == n and all(is_prime(f) for f in fs)
+    assert factorize(1) == []
+    for n in [0, -12]:
+        try:
+            factorize(n)
+            assert False
+        except ValueError:
+            pass
+
+    if np is not None:
+        rng = np.random.default_rng(12345)
+        ns = rng.integers(2, 2**62, size=10**4, dtype=np.int64)
+        flags = is_prime_batch(ns)
+        assert all(flags[i] == is_prime(int(n)) for (i, n) in enumerate(ns))
+        print(f"Of {len(ns)} random 62-bit numbers, {flags.sum()} are prime.")
+        fs = factorize_batch(ns[:5])
+        for (n, f) in zip(ns[:5], fs):
+            print(f"{n} = {' * '.join(str(x) for x in f)}")
+
+
+if __name__ == "__main__":
+    __demo()
@@ -0,0 +1,180 @@
+from itertools import permutations, combinations, combinations_with_replacement, islice, chain
+from math import comb, perm
+
+# The functions permutations, combinations and combinations_with_replacement
+# of itertools produce their results in lexicographic order of positions
+# of the elements in the original iterable, one result at the time, always
+# starting from the first one. To split the sweep over all n! permutations
+# or all choose(52, 5) poker hands evenly between several processes, we
+# need to rank each result into its position in this order, and the other
+# way around, unrank any position directly into the result in that position
+# without generating all the results before it.
+
+# All functions here work with tuples of positions, so that they do not
+# care what the elements in the iterable actually are.
+
+# The rank of an r-permutation of positions from range(n). Each position
+# skips over all the permutations that have a smaller position still
+# available in that spot, each such choice followed by perm(n-i-1, r-i-1)
+# ways to fill in the rest.
+
+def permutation_rank(p, n):
+    r, result, used = len(p), 0, set()
+    for (i, x) in enumerate(p):
+        smaller = x - sum(1 for u in used if u < x)
+        result += smaller * perm(n - i - 1, r - i - 1)
+        used.add(x)
+    return result
+
+
+def permutation_unrank(rank, n, r=None):
+    r = n if r is None else r
+    available, result = list(range(n)), []
+    for i in range(r):
+        block = perm(n - i - 1, r - i - 1)
+        idx, rank = divmod(rank, block)
+        result.append(available.pop(idx))
+    return tuple(result)
+
+
+# The rank of an r-combination of positions from range(n). For each
+# position, count the combinations that would have a smaller value in
+# that spot with the same prefix before it.
+
+def combination_rank(c, n):
+    r, result, prev = len(c), 0, -1
+    for (i, x) in enumerate(c):
+        for v in range(prev + 1, x):
+            result += comb(n - v - 1, r - i - 1)
+        prev = x
+    return result
+
+
+def combination_unrank(rank, n, r):
+    result, v = [], 0
+    for i in range(r):
+        # Skip over the blocks of combinations that start with smaller v.
+        while True:
+            block = comb(n - v - 1, r - i - 1)
+            if rank < block:
+                break
+            rank -= block
+            v += 1
+        result.append(v)
+        v += 1
+    return tuple(result)
+
+
+# A multicombination c[0] <= c[1] <= ... <= c[r-1] of range(n) turns into
+# an ordinary combination of range(n+r-1) by adding i to each c[i]. This
+# mapping preserves the lexicographic order, so that the previous functions
+# can do the work for multicombinations also.
+
+def multicombination_rank(c, n):
+    return combination_rank(tuple(x + i for (i, x) in enumerate(c)), n + len(c) - 1)
+
+
+def multicombination_unrank(rank, n, r):
+    c = combination_unrank(rank, n + r - 1, r)
+    return tuple(x - i for (i, x) in enumerate(c))
+
+
+# All the results after the given one, in the same order as itertools.
+# With the prefix before spot i kept fixed, the results that have a
+# larger element v in spot i come next, for each v in ascending order,
+# followed by all ways to fill in the rest from the remaining elements.
+# Each such block is produced by itertools, with the prefix added by map,
+# so that no Python code runs for the individual results in the block.
+
+def __combination_blocks(pool, c):
+    r = len(c)
+    for i in reversed(range(r)):
+        prefix = tuple(pool[j] for j in c[:i])
+        for v in range(c[i] + 1, len(pool)):
+            yield map((prefix + (pool[v],)).__add__, combinations(pool[v + 1:], r - i - 1))
+
+
+def __multicombination_blocks(pool, c):
+    r = len(c)
+    for i in reversed(range(r)):
+        prefix = tuple(pool[j] for j in c[:i])
+        for v in range(c[i] + 1, len(pool)):
+            yield map((prefix + (pool[v],)).__add__, combinations_with_replacement(pool[v:], r - i - 1))
+
+
+def __permutation_blocks(pool, p):
+    r = len(p)
+    for i in reversed(range(r)):
+        prefix = tuple(pool[j] for j in p[:i])
+        available = sorted(set(range(len(pool))) - set(p[:i]))
+        for v in available:
+            if v > p[i]:
+                rest = [pool[j] for j in available if j != v]
+                yield map((prefix + (pool[v],)).__add__, permutations(rest, r - i - 1))
+
+
+# Split the results into n slices of as equal size as possible, and return
+# an iterator over the results of the slice number i, starting directly
+# from its first result. The union of all n slices is exactly the same as
+# produced by the corresponding function of itertools, in the same order.
+
+def __shard(pool, i, n, total, unrank, blocks):
+    start, stop = i * total // n, (i + 1) * total // n
+    if start >= stop:
+        return iter(())
+    idx = unrank(start)
+    first = tuple(pool[j] for j in idx)
+    return islice(chain([first], chain.from_iterable(blocks(pool, idx))), stop - start)
+
+
+def combinations_shard(iterable, r, i, n):
+    pool = tuple(iterable)
+    m = len(pool)
+    return __shard(pool, i, n, comb(m, r), lambda k: combination_unrank(k, m, r), __combination_blocks)
+
+
+def multicombinations_shard(iterable, r, i, n):
+    pool = tuple(iterable)
+    m = len(pool)
+    total = comb(m + r - 1, r) if m > 0 else int(r == 0)
+    return __shard(pool, i, n, total, lambda k: multicombination_unrank(k, m, r), __multicombination_blocks)
+
+
+def permutations_shard(iterable, i, n, r=None):
+    pool = tuple(iterable)
+    m = len(pool)
+    r = m if r is None else r
+    return __shard(pool, i, n, perm(m, r), lambda k: permutation_unrank(k, m, r), __permutation_blocks)
+
+
+def __demo():
+    # Gold testing against itertools.
+    for m in range(0, 7):
+        for r in range(0, m + 1):
+            for (k, c) in enumerate(combinations(range(m), r)):
+                assert combination_rank(c, m) == k and combination_unrank(k, m, r) == c
+            for (k, c) in enumerate(combinations_with_replacement(range(m), r)):
+                assert multicombination_rank(c, m) == k and multicombination_unrank(k, m, r) == c
+            for (k, p) in enumerate(permutations(range(m), r)):
+                assert permutation_rank(p, m) == k and permutation_unrank(k, m, r) == p
+            for shards in range(1, 5):
+                assert [c for i in range(shards) for c in combinations_shard('abcdef'[:m], r, i, shards)] \
+                    == list(combinations('abcdef'[:m], r))
+                assert [c for i in range(shards) for c in multicombinations_shard('abcdef'[:m], r, i, shards)] \
+                    == list(combinations_with_replacement('abcdef'[:m], r))
+                assert [p for i in range(shards) for p in permutations_shard('abcdef'[:m], i, shards, r)] \
+                    == list(permutations('abcdef'[:m], r))
+    print("All ranks, unranks and shards agree with itertools.")
+
+    k = 10**6
+    print(f"Permutation of range(10) in position {k} is {permutation_unrank(k, 10)}.")
+    print(f"Poker hand in position {k} has positions {combination_unrank(k, 52, 5)}.")
+    print("The first hands of each of the four shards of 52 choose 5 are:")
+    for i in range(4):
+        print(next(combinations_shard(range(52), 5, i, 4)))
+    print("The first three permutations of the third shard of 12! are:")
+    print(list(islice(permutations_shard(range(12), 2, 3), 3)))
+
+
+if __name__ == "__main__":
+    __demo()
@@ -1,6 +1,8 @@
 from functools import lru_cache
 from fractions import Fraction
 from itertools import islice
+from bisect import bisect_right
+from math import isqrt
 
 # Many problems can be solved surprisingly easily by first
 # solving a smaller version of that problem, whose result is
@@ -107,6 +109,122 @@ def subset_sum(items, goal):
     return answer
 
 
+# The same answer can be found without backtracking, once we know
+# which sums can be reached with each prefix items[:i] of the items.
+# Going through the items from the last to the first, take the item
+# whenever the rest of the goal can still be reached with the items
+# before it. This is exactly the choice that the recursion makes.
+
+# When the items are nonnegative integers, the sums reachable with a
+# prefix fit into one Python integer used as a set of bits, bit s set
+# if the sum s can be reached. Adding the next item x to the prefix
+# is then just reach | (reach << x), done by Python at machine speed
+# without any Python-level loop over the possible sums.
+
+# Keeping the bit sets of all n + 1 prefixes would take n * goal bits
+# of memory. Instead, only the bit set of every b:th prefix is kept for
+# b = ceil(sqrt(n)), and the bit sets inside each block of b items are
+# computed again from its first one when the reconstruction of all the
+# goals together reaches that block. This needs only 2 * sqrt(n) * goal
+# bits of memory, for the price of computing every bit set twice.
+
+def __bitset_subset_sums(items, goals):
+    n, top = len(items), max(max(goals), 0)
+    mask = (1 << (top + 1)) - 1
+    b = isqrt(n - 1) + 1 if n > 0 else 1
+    firsts, reach = [], 1
+    for (i, x) in enumerate(items):
+        if i % b == 0:
+            firsts.append(reach)
+        reach = (reach | (reach << x)) & mask
+    # The rest of each goal still to reach, None if it can't be reached.
+    rest = [goal if goal >= 0 and (reach >> goal) & 1 else None for goal in goals]
+    answers = [[] if r is not None else None for r in rest]
+    for c in range(len(firsts) - 1, -1, -1):
+        lo, hi = c * b, min(c * b + b, n)
+        block = [firsts[c]]
+        for x in items[lo:hi - 1]:
+            block.append((block[-1] | (block[-1] << x)) & mask)
+        for i in range(hi - 1, lo - 1, -1):
+            x, reach = items[i], block[i - lo]
+            for (t, r) in enumerate(rest):
+                # Take the item if the rest of the goal can be reached without it.
+                if r and r >= x and (reach >> (r - x)) & 1:
+                    answers[t].append(x)
+                    rest[t] = r - x
+    for answer in answers:
+        if answer is not None:
+            answer.reverse()
+    return answers
+
+
+# With only a few items but a huge goal, there are fewer subsets of
+# each half of the items than there are possible sums. Meet in the
+# middle lists the sums of all subsets of both halves, and the goal
+# can be reached if goal - t is found in the sorted low half-sums for
+# some subset sum t of the high half.
+
+# Listing subsets as bit masks, the recursion prefers the subset whose
+# mask is highest, except that it stops taking zero items as soon as
+# the goal has been reached. Going through the high half masks in
+# descending order, the first one that works is the right one, and the
+# right low half subset is the highest mask with the rest of the sum.
+
+def __half_sums(half):
+    # The sum of the subset whose bit j is on when half[j] is taken.
+    sums = [0]
+    for x in half:
+        sums += [s + x for s in sums]
+    return sums
+
+
+def __meet_in_the_middle(items):
+    k = len(items) // 2
+    low_sums, high = __half_sums(items[:k]), __half_sums(items[k:])
+    # Sorting is stable, so that equal sums keep their masks in order.
+    order = sorted(range(len(low_sums)), key=low_sums.__getitem__)
+    low = [low_sums[m] for m in order]
+
+    def solve(goal):
+        if goal < 0:
+            return None
+        for m in range(len(high) - 1, -1, -1):
+            i = bisect_right(low, goal - high[m])
+            if i > 0 and low[i - 1] == goal - high[m]:
+                taken = [j for j in range(k) if order[i - 1] >> j & 1]
+                taken += [k + j for j in range(len(items) - k) if m >> j & 1]
+                # Drop the zero items that come before the first nonzero one.
+                first = next((j for j in taken if items[j] != 0), len(items))
+                return [items[j] for j in taken if j >= first]
+        return None
+    return solve
+
+
+# Answer many goals over the same items at once. Returns the list of
+# answers, each the same as what subset_sum would return for that goal.
+
+def subset_sums(items, goals, method=None):
+    if any(x < 0 for x in items):
+        raise ValueError("Subset sum items may not be negative.")
+    items, goals = list(items), list(goals)
+    top = max(goals, default=0)
+    if method is None:
+        # Estimated work of both methods, as the bit operations of the
+        # reachable sets against the Python-level steps of the half-sums.
+        method = 'mitm' if 1000 * 2 ** ((len(items) + 1) // 2) < len(items) * top else 'dp'
+    if method == 'dp':
+        return __bitset_subset_sums(items, goals) if goals else []
+    elif method == 'mitm':
+        solve = __meet_in_the_middle(items)
+        return [solve(goal) for goal in goals]
+    else:
+        raise ValueError(f"Unknown subset sum method {method}")
+
+
+def subset_sum_fast(items, goal, method=None):
+    return subset_sums(items, [goal], method)[0]
+
+
 # Hofstadter's recursive Q-function, memoized for efficiency.
 # http://paulbourke.net/fractals/qseries/
 
@@ -203,6 +321,23 @@ def __demo():
     print(f"\nSolving subset sum with {items}:")
     for goal in range(60, 81):
         print(f"Goal {goal}: solution {subset_sum(items, goal)!r}")
+    # Gold testing the fast versions against the recursion.
+    goals = list(range(sum(items) + 2))
+    expected = [subset_sum(items, goal) for goal in goals]
+    assert subset_sums(items, goals, 'dp') == expected
+    assert subset_sums(items, goals, 'mitm') == expected
+
+    items = [(i * i * 1234567) % 100003 for i in range(1, 301)]
+    goals = [123456, 1234567, 7654321, 9999999]
+    print(f"\nSolving subset sum with {len(items)} items for goals {goals}:")
+    for (goal, answer) in zip(goals, subset_sums(items, goals)):
+        print(f"Goal {goal}: {len(answer)} items, first {answer[:5]}")
+
+    items = [(i * i * 1234567891) % 10**12 for i in range(1, 35)]
+    goal = sum(items[::3])
+    answer = subset_sum_fast(items, goal)
+    print(f"\nMeet in the middle with {len(items)} items for goal {goal}:")
+    print(f"Solution has {len(answer)} items adding up to {sum(answer)}.")
 
     print("\nFlattening the list produces the following:")
     print(flatten([1, (42, 99), [2, [3, [4, [5], 6], 7], 8], 9]))
@@ -0,0 +1,213 @@
+import os
+import pickle
+from abc import ABC, abstractmethod
+from array import array
+from collections import deque
+from itertools import islice, takewhile
+
+from generators import primes, kolakoski
+from recursion import hof_q_gen
+
+# A generator keeps its state in the local variables of its suspended
+# execution frame, which cannot be pickled and saved on the disk. If a
+# sweep over the primes or the Hofstadter Q-sequence that has been
+# running for hours dies for whatever reason, all that work is lost. The
+# classes in this module instead keep their state in ordinary instance
+# attributes, so that the state can be written into a checkpoint file
+# every interval elements, and the next run can continue from the latest
+# checkpoint as if nothing happened. Elements that were produced after
+# the latest checkpoint will be produced again after the restart.
+
+# The abstract superclass takes care of the iteration and the checkpoint
+# file, and each subclass only needs to define how to produce its next
+# element, and how to get and restore its state.
+
+class Resumable(ABC):
+
+    def __init__(self, path=None, interval=10**5):
+        self.__path = path
+        self.__interval = interval
+        self.__since = 0
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as f:
+                self.restore(pickle.load(f))
+
+    # Subclasses must implement these three methods.
+
+    @abstractmethod
+    def advance(self):
+        pass
+
+    @abstractmethod
+    def state(self):
+        pass
+
+    @abstractmethod
+    def restore(self, state):
+        pass
+
+    # Write the state first into a temporary file that then replaces the
+    # previous checkpoint, so that a crash in the middle of writing never
+    # leaves behind a corrupted checkpoint file.
+
+    def save(self):
+        if self.__path is not None:
+            tmp = self.__path + '.tmp'
+            with open(tmp, 'wb') as f:
+                pickle.dump(self.state(), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self.__path)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        result = self.advance()
+        self.__since += 1
+        if self.__since == self.__interval:
+            self.save()
+            self.__since = 0
+        return result
+
+
+# The prime numbers, same as the primes generator. The primes found so
+# far are kept in a compact array of 64-bit integers instead of a list.
+
+class ResumablePrimes(Resumable):
+
+    def __init__(self, path=None, interval=10**5):
+        self.__primes = array('q')
+        self.__curr = 2
+        super().__init__(path, interval)
+
+    def advance(self):
+        curr = self.__curr
+        # Test divisibility only by the primes up to the square root.
+        while any(curr % p == 0 for p in takewhile(lambda p: p * p <= curr, self.__primes)):
+            curr += 2
+        self.__primes.append(curr)
+        self.__curr = 3 if curr == 2 else curr + 2
+        return curr
+
+    def state(self):
+        return self.__primes, self.__curr
+
+    def restore(self, state):
+        self.__primes, self.__curr = state
+
+
+# Hofstadter's Q-sequence, same as the hof_q_gen generator in recursion.py.
+
+class ResumableHofQ(Resumable):
+
+    def __init__(self, path=None, interval=10**5):
+        self.__q = array('q')
+        super().__init__(path, interval)
+
+    def advance(self):
+        q, n = self.__q, len(self.__q)
+        q.append(1 if n < 3 else q[n - q[n-1]] + q[n - q[n-2]])
+        return q[-1]
+
+    def state(self):
+        return self.__q
+
+    def restore(self, state):
+        self.__q = state
+
+
+# The Kolakoski sequence, same as the kolakoski generator in generators.py.
+# The queue of elements computed but not yet yielded is saved as an array
+# of bytes, since its elements are small.
+
+class ResumableKolakoski(Resumable):
+
+    def __init__(self, n=2, path=None, interval=10**5):
+        self.__n = n
+        self.__q, self.__prev = deque([1, 2, 2]), 2
+        self.__produced = 0
+        super().__init__(path, interval)
+
+    def advance(self):
+        v = self.__q.popleft()
+        self.__produced += 1
+        # The first two elements are the hardcoded start of the sequence.
+        if self.__produced > 2:
+            self.__prev = self.__prev + 1 if self.__prev < self.__n else 1
+            self.__q.extend([self.__prev] * v)
+        return v
+
+    def state(self):
+        return self.__n, array('B', self.__q), self.__prev, self.__produced
+
+    def restore(self, state):
+        self.__n, q, self.__prev, self.__produced = state
+        self.__q = deque(q)
+
+
+# A sweep over the Collatz sequences of the starting values in the given
+# range, producing the pairs (start, steps) of how many steps it takes
+# for each starting value to reach one.
+
+class ResumableCollatzSweep(Resumable):
+
+    def __init__(self, start, end, path=None, interval=10**5):
+        self.__curr, self.__end = start, end
+        super().__init__(path, interval)
+
+    def advance(self):
+        if self.__curr >= self.__end:
+            raise StopIteration
+        n, steps = self.__curr, 0
+        while n != 1:
+            n = n // 2 if n % 2 == 0 else 3 * n + 1
+            steps += 1
+        self.__curr += 1
+        return self.__curr - 1, steps
+
+    def state(self):
+        return self.__curr, self.__end
+
+    def restore(self, state):
+        self.__curr, self.__end = state
+
+
+def __demo():
+    path = 'resumable_demo.ckpt'
+    if os.path.exists(path):
+        os.remove(path)
+
+    # Simulate a job that dies after producing 25000 primes, after
+    # writing its latest checkpoint at 20000 primes.
+    job = ResumablePrimes(path, interval=10000)
+    first = list(islice(job, 25000))
+    print(f"First run produced primes up to {first[-1]}, and then died.")
+    job = ResumablePrimes(path, interval=10000)
+    second = list(islice(job, 10000))
+    print(f"Second run continued from prime {second[0]} to {second[-1]}.")
+    assert first[:20000] + second == list(islice(primes(), 30000))
+    os.remove(path)
+
+    job = ResumableHofQ(path, interval=1000)
+    first = list(islice(job, 1500))
+    second = list(islice(ResumableHofQ(path), 1000))
+    assert first[:1000] + second == list(islice(hof_q_gen(), 2000))
+    print("Hofstadter Q-sequence also resumed correctly at position 1000.")
+    os.remove(path)
+
+    job = ResumableKolakoski(3, path, interval=1000)
+    first = list(islice(job, 1500))
+    second = list(islice(ResumableKolakoski(3, path), 1000))
+    assert first[:1000] + second == list(islice(kolakoski(3), 2000))
+    print("Kolakoski(3) sequence also resumed correctly at position 1000.")
+    os.remove(path)
+
+    job = ResumableCollatzSweep(1, 10**4, path, interval=1000)
+    first = list(islice(job, 1500))
+    second = list(ResumableCollatzSweep(1, 10**4, path))
+    longest = max(first[:1000] + second, key=lambda p: p[1])
+    print(f"Longest Collatz sequence under 10**4 starts from {longest[0]}, taking {longest[1]} steps.")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    __demo()
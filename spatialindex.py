@@ -0,0 +1,296 @@
+import random
+from abc import ABC, abstractmethod
+from heapq import heappush, heappushpop
+from math import isqrt
+from time import perf_counter
+
+from geometry import dist
+
+# NumPy is used for the bulk construction of the indices from arrays of
+# points, and for the brute force comparison in the demo. Without it,
+# the indices are built with ordinary Python sorting.
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# With only the function dist of geometry.py, finding the nearest point
+# to the query point, or all points within the given distance of it,
+# means looping through all the points. A spatial index arranges the
+# points once so that each query needs to look at only the points near
+# the query point. As in geometry.py, all distances are squared so that
+# they can be computed exactly with integers.
+
+# Both indices answer the queries with the positions of the points in
+# the original sequence. Points at equal distance from the query point
+# are ordered by their positions, so that the answers are unique.
+
+class PointIndex(ABC):
+
+    # The positions of the k nearest points to q, nearest first.
+    @abstractmethod
+    def nearest(self, q, k=1):
+        pass
+
+    # The sorted positions of the points p with dist(p, q) <= d.
+    @abstractmethod
+    def within(self, q, d):
+        pass
+
+    # Batched versions of the previous queries, for an entire sequence or
+    # an (m, 2) array of query points at once.
+
+    def nearest_all(self, qs, k=1):
+        qs = qs.tolist() if np is not None and isinstance(qs, np.ndarray) else qs
+        result = [self.nearest(tuple(q), k) for q in qs]
+        # Fewer than k points means fewer than k nearest points.
+        k = len(result[0]) if result else k
+        return np.array(result, dtype=np.int64).reshape(-1, k) if np is not None else result
+
+    def within_all(self, qs, d):
+        qs = qs.tolist() if np is not None and isinstance(qs, np.ndarray) else qs
+        return [self.within(tuple(q), d) for q in qs]
+
+
+# Helper functions for both indices. These are not private, since the
+# names of the form __name would get mangled inside the class bodies.
+
+# Keep the k best (distance, position) candidates found so far, as a heap
+# of negated pairs so that the worst candidate is at the top.
+
+def keep_nearest(heap, k, d, i):
+    if len(heap) < k:
+        heappush(heap, (-d, -i))
+    elif (d, i) < (-heap[0][0], -heap[0][1]):
+        heappushpop(heap, (-d, -i))
+
+
+# The coordinates of the points as two lists of Python integers, so that
+# the distances computed from them can never overflow.
+
+def coordinate_lists(pts):
+    if np is not None:
+        pts = np.asarray(pts, dtype=np.int64).reshape(-1, 2)
+        return pts[:, 0].tolist(), pts[:, 1].tolist()
+    return [x for (x, y) in pts], [y for (x, y) in pts]
+
+
+# A k-d tree splits the points at the median of the x-coordinates, then
+# both halves at the median of their y-coordinates, and so on, until at
+# most leaf_size points remain. The tree is implicit in the order of the
+# points: the subtree of the range [lo, hi) has its median point in the
+# middle position, the smaller points before it and the larger after it.
+
+class KDTree(PointIndex):
+
+    def __init__(self, pts, leaf_size=16):
+        xs, ys = coordinate_lists(pts)
+        n, self.__leaf = len(xs), leaf_size
+        if np is not None:
+            coords = (np.array(xs, dtype=np.int64), np.array(ys, dtype=np.int64))
+            order = np.arange(n)
+        else:
+            coords, order = (xs, ys), list(range(n))
+        stack = [(0, n, 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if hi - lo <= leaf_size:
+                continue
+            mid = (lo + hi) // 2
+            sub = order[lo:hi]
+            if np is not None:
+                # Partition around the median in linear time.
+                order[lo:hi] = sub[np.argpartition(coords[axis][sub], mid - lo)]
+            else:
+                order[lo:hi] = sorted(sub, key=lambda i: coords[axis][i])
+            stack.append((lo, mid, 1 - axis))
+            stack.append((mid + 1, hi, 1 - axis))
+        order = order.tolist() if np is not None else order
+        self.__order = order
+        self.__xs = [xs[i] for i in order]
+        self.__ys = [ys[i] for i in order]
+
+    def nearest(self, q, k=1):
+        heap, (qx, qy) = [], q
+        xs, ys, order, leaf = self.__xs, self.__ys, self.__order, self.__leaf
+
+        def search(lo, hi, axis):
+            if hi - lo <= leaf:
+                for j in range(lo, hi):
+                    keep_nearest(heap, k, (xs[j] - qx) ** 2 + (ys[j] - qy) ** 2, order[j])
+                return
+            mid = (lo + hi) // 2
+            keep_nearest(heap, k, (xs[mid] - qx) ** 2 + (ys[mid] - qy) ** 2, order[mid])
+            diff = (qx - xs[mid]) if axis == 0 else (qy - ys[mid])
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            search(*near, 1 - axis)
+            # The far side can have equally near points only within diff.
+            if len(heap) < k or diff * diff <= -heap[0][0]:
+                search(*far, 1 - axis)
+        search(0, len(xs), 0)
+        return [-i for (_, i) in sorted(heap, reverse=True)]
+
+    def within(self, q, d):
+        result, (qx, qy) = [], q
+        xs, ys, order, leaf = self.__xs, self.__ys, self.__order, self.__leaf
+        stack = [(0, len(xs), 0)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if hi - lo <= leaf:
+                result.extend(order[j] for j in range(lo, hi) if (xs[j] - qx) ** 2 + (ys[j] - qy) ** 2 <= d)
+                continue
+            mid = (lo + hi) // 2
+            if (xs[mid] - qx) ** 2 + (ys[mid] - qy) ** 2 <= d:
+                result.append(order[mid])
+            diff = (qx - xs[mid]) if axis == 0 else (qy - ys[mid])
+            if diff <= 0 or diff * diff <= d:
+                stack.append((lo, mid, 1 - axis))
+            if diff >= 0 or diff * diff <= d:
+                stack.append((mid + 1, hi, 1 - axis))
+        return sorted(result)
+
+
+# A uniform grid of square cells puts each point into the cell that it is
+# in, the cell side chosen to make the cells contain about two points on
+# average. For points along a long and thin strip, the side is also at
+# least the longer side of the bounding box divided by n, so that there
+# are never more than O(n) cells. The points are sorted by their cells,
+# so that the points in each cell are found in one slice of the sorted
+# lists. This works best when the points are spread evenly, whereas the
+# k-d tree adapts to any distribution of points.
+
+class GridIndex(PointIndex):
+
+    def __init__(self, pts, side=None):
+        xs, ys = coordinate_lists(pts)
+        n = len(xs)
+        self.__x0, self.__y0 = min(xs), min(ys)
+        w, h = max(xs) - self.__x0 + 1, max(ys) - self.__y0 + 1
+        self.__side = side = side if side else max(1, isqrt(2 * w * h // n), -(-max(w, h) // n))
+        self.__nx, self.__ny = nx, ny = (w - 1) // side + 1, (h - 1) // side + 1
+        if np is not None:
+            keys = (np.array(xs, dtype=np.int64) - self.__x0) // side * ny + \
+                   (np.array(ys, dtype=np.int64) - self.__y0) // side
+            order = np.argsort(keys, kind='stable')
+            starts = np.searchsorted(keys[order], np.arange(nx * ny + 1)).tolist()
+            order = order.tolist()
+        else:
+            keys = [(x - self.__x0) // side * ny + (y - self.__y0) // side for (x, y) in zip(xs, ys)]
+            order = sorted(range(n), key=lambda i: keys[i])
+            starts, j = [], 0
+            for c in range(nx * ny + 1):
+                while j < n and keys[order[j]] < c:
+                    j += 1
+                starts.append(j)
+        self.__order, self.__starts = order, starts
+        self.__xs = [xs[i] for i in order]
+        self.__ys = [ys[i] for i in order]
+
+    def __cell(self, q):
+        return (q[0] - self.__x0) // self.__side, (q[1] - self.__y0) // self.__side
+
+    # Look at the cells in rings of growing size around the cell of q. Once
+    # the ring r has been looked at, every point not yet seen is at least
+    # r cell sides away, so the search can stop if the k:th nearest point
+    # found so far is closer than that.
+
+    def nearest(self, q, k=1):
+        heap, (qx, qy) = [], q
+        xs, ys, order, starts = self.__xs, self.__ys, self.__order, self.__starts
+        nx, ny, side = self.__nx, self.__ny, self.__side
+        cx, cy = self.__cell(q)
+        # The first ring that touches the grid, and the ring that covers it.
+        r = max(0, -cx, cx - nx + 1, -cy, cy - ny + 1)
+        last = max(cx, nx - 1 - cx, cy, ny - 1 - cy)
+        k = min(k, len(xs))
+        while r <= last:
+            for x in range(max(cx - r, 0), min(cx + r, nx - 1) + 1):
+                # Only the top and bottom rows of the ring, unless on its sides.
+                step = 1 if x in (cx - r, cx + r) else 2 * r
+                for y in range(cy - r, cy + r + 1, step):
+                    if 0 <= y < ny:
+                        c = x * ny + y
+                        for j in range(starts[c], starts[c + 1]):
+                            keep_nearest(heap, k, (xs[j] - qx) ** 2 + (ys[j] - qy) ** 2, order[j])
+            if len(heap) == k and -heap[0][0] < (r * side) ** 2:
+                break
+            r += 1
+        return [-i for (_, i) in sorted(heap, reverse=True)]
+
+    def within(self, q, d):
+        result, (qx, qy) = [], q
+        xs, ys, order, starts = self.__xs, self.__ys, self.__order, self.__starts
+        nx, ny = self.__nx, self.__ny
+        # Points within the distance have both coordinates within isqrt(d).
+        s = isqrt(d) if d >= 0 else -1
+        x1, y1 = self.__cell((qx - s, qy - s))
+        x2, y2 = self.__cell((qx + s, qy + s))
+        for x in range(max(x1, 0), min(x2, nx - 1) + 1):
+            lo, hi = x * ny + max(y1, 0), x * ny + min(y2, ny - 1)
+            if lo <= hi:
+                # The cells of one column are consecutive in the sorted order.
+                result.extend(order[j] for j in range(starts[lo], starts[hi + 1])
+                              if (xs[j] - qx) ** 2 + (ys[j] - qy) ** 2 <= d)
+        return sorted(result)
+
+
+# Brute force reference answers, computed with NumPy over all points.
+
+def __brute_nearest(pts, q, k):
+    d = ((pts - np.array(q)) ** 2).sum(axis=1)
+    # Only the points as near as the k:th nearest need to be sorted.
+    idx = np.flatnonzero(d <= np.partition(d, k - 1)[k - 1])
+    return sorted(idx.tolist(), key=lambda i: (d[i], i))[:k]
+
+
+def __brute_within(pts, q, d):
+    return np.flatnonzero(((pts - np.array(q)) ** 2).sum(axis=1) <= d).tolist()
+
+
+def __demo():
+    rng = random.Random(12345)
+    # Gold testing against the dist function of geometry.py.
+    for trial in range(200):
+        m = rng.choice([3, 10, 1000])
+        pts = [(rng.randint(-m, m), rng.randint(-m, m)) for _ in range(rng.randint(1, 300))]
+        indices = [KDTree(pts, rng.randint(1, 8)), GridIndex(pts)]
+        for _ in range(10):
+            q = (rng.randint(-2 * m, 2 * m), rng.randint(-2 * m, 2 * m))
+            k, d = rng.randint(1, 10), rng.randint(0, m * m)
+            ranked = sorted(range(len(pts)), key=lambda i: (dist(pts[i], q), i))
+            inside = [i for i in range(len(pts)) if dist(pts[i], q) <= d]
+            for index in indices:
+                assert index.nearest(q, k) == ranked[:k]
+                assert index.within(q, d) == inside
+                # Also when k is more than the number of points.
+                assert [list(map(int, r)) for r in index.nearest_all([q], k)] == [ranked[:k]]
+    print("Both indices agree with dist for all queries.")
+
+    if np is None:
+        return
+    n, m = 10**6, 10**7
+    gen = np.random.default_rng(12345)
+    pts = gen.integers(0, m, size=(n, 2))
+    qs = gen.integers(0, m, size=(1000, 2))
+    d = (m // 300) ** 2
+    for cls in (KDTree, GridIndex):
+        start = perf_counter()
+        index = cls(pts)
+        print(f"\nBuilding {cls.__name__} of {n} points took {perf_counter() - start:.2f} seconds.")
+        start = perf_counter()
+        near = index.nearest_all(qs, 5)
+        print(f"Five nearest points for {len(qs)} queries took {perf_counter() - start:.2f} seconds.")
+        start = perf_counter()
+        inside = index.within_all(qs, d)
+        print(f"Points within distance for {len(qs)} queries took {perf_counter() - start:.2f} seconds.")
+        assert all(near[i].tolist() == __brute_nearest(pts, q, 5) for (i, q) in enumerate(qs[:10].tolist()))
+        assert all(inside[i] == __brute_within(pts, q, d) for (i, q) in enumerate(qs[:10].tolist()))
+    start = perf_counter()
+    for q in qs[:10].tolist():
+        __brute_nearest(pts, q, 5)
+    print(f"\nBrute force would take {(perf_counter() - start) * len(qs) / 10:.2f} seconds for the same queries.")
+
+
+if __name__ == "__main__":
+    __demo()
@@ -0,0 +1,169 @@
+import random
+from fractions import Fraction
+from heapq import heappush, heappop
+
+from geometry import cross, line_segment_intersect, convex_hull, Polygon
+
+# The functions of geometry.py assume that the polygon edges do not cross
+# each other, but checking this by calling line_segment_intersect for
+# every pair of edges takes quadratic time. Sweeping an imaginary vertical
+# line over the plane from left to right, two segments can intersect only
+# after they have become neighbours along the sweep line, so only the
+# pairs of neighbours need to be checked.
+
+# The sweep line is really a point that moves from left to right, and at
+# each x-coordinate from bottom to top, so that a vertical segment gets
+# swept the same way as the other segments. The events are the segment
+# endpoints and the intersection points found so far, kept in a heap in
+# this order. The status list keeps the segments that cross the sweep
+# line, sorted from bottom to top just after the current event point.
+
+# Intersection points are computed exactly as fractions, and the same
+# cross function that works on integers works on them just as well.
+
+# The intersection point of two segments, if they meet in exactly one
+# point. Overlapping collinear segments return None, since the endpoints
+# of their common part are already events of the sweep anyway.
+
+def intersection_point(s, t):
+    (a, b), (c, d) = s, t
+    denom = cross((0, 0), (b[0] - a[0], b[1] - a[1]), (d[0] - c[0], d[1] - c[1]))
+    if denom == 0 or not line_segment_intersect(a, b, c, d):
+        return None
+    u = Fraction(cross(c, d, a), denom)
+    x, y = a[0] + u * (b[0] - a[0]), a[1] + u * (b[1] - a[1])
+    # Integer points are kept as integers.
+    return (int(x) if x.denominator == 1 else x), (int(y) if y.denominator == 1 else y)
+
+
+# The direction in which a segment leaves its left endpoint, as a key
+# that sorts the segments from bottom to top. Vertical segments go last.
+
+def __slope(seg):
+    (x0, y0), (x1, y1) = seg
+    return (1, 0) if x0 == x1 else (0, Fraction(y1 - y0, x1 - x0))
+
+
+# Generate the intersection points in sweep order, each as a pair of the
+# point and the sorted list of the indices of the segments through it.
+# The time is O((n + k) log n) for n segments and k intersection points,
+# not counting the time to insert into and remove from the status list,
+# which is fast in practice for Python lists.
+
+def intersections(segments):
+    # Orient each segment to go from its first endpoint to its last.
+    segs = [tuple(sorted(s)) for s in segments]
+    starts, events, scheduled = {}, [], set()
+
+    def schedule(p):
+        if p not in scheduled:
+            scheduled.add(p)
+            heappush(events, p)
+    for (i, (a, b)) in enumerate(segs):
+        starts.setdefault(a, []).append(i)
+        schedule(a)
+        schedule(b)
+
+    def check(i, j, p):
+        q = intersection_point(segs[i], segs[j])
+        if q is not None and q > p:
+            schedule(q)
+
+    status = []
+    while events:
+        p = heappop(events)
+        # The segments that contain p form a contiguous block of the status.
+        lo, hi = 0, len(status)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if cross(*segs[status[mid]], p) > 0:
+                lo = mid + 1
+            else:
+                hi = mid
+        end = lo
+        while end < len(status) and cross(*segs[status[end]], p) == 0:
+            end += 1
+        upper = starts.get(p, [])
+        contain = status[lo:end]
+        through = sorted(upper + contain)
+        if len(through) > 1:
+            yield p, through
+        # Reinsert the segments that continue past p in their new order.
+        cont = [i for i in contain if segs[i][1] != p] + [i for i in upper if segs[i][1] != p]
+        cont.sort(key=lambda i: (__slope(segs[i]), i))
+        status[lo:end] = cont
+        if cont:
+            if lo > 0:
+                check(status[lo - 1], cont[0], p)
+            if lo + len(cont) < len(status):
+                check(cont[-1], status[lo + len(cont)], p)
+        elif 0 < lo < len(status):
+            check(status[lo - 1], status[lo], p)
+
+
+# Shamos-Hoey: whether any two segments intersect is answered by the first
+# intersection point of the sweep. No intersection events are processed
+# before the first one, so this needs only O(n log n) time.
+
+def any_intersection(segments):
+    return next(intersections(segments), None)
+
+
+# A polygon is simple if its edges meet only at their shared corner points.
+
+def polygon_is_simple(poly):
+    n = len(poly)
+    edges = poly.edges if isinstance(poly, Polygon) else [(poly[i - 1], poly[i]) for i in range(n)]
+    for (p, through) in intersections(edges):
+        if len(through) != 2:
+            return False
+        # Edges k and k+1 share the corner point poly[k].
+        i, j = through
+        k = i if j == i + 1 else (n - 1 if (i, j) == (0, n - 1) else None)
+        if k is None or poly[k] != p:
+            return False
+        # The two edges may not double back over each other.
+        a, c = poly[k - 1], poly[(k + 1) % n]
+        if cross(a, p, c) == 0 and (a[0] - p[0]) * (c[0] - p[0]) + (a[1] - p[1]) * (c[1] - p[1]) > 0:
+            return False
+    return True
+
+
+def __demo():
+    rng = random.Random(12345)
+    # Gold testing against all pairs of line_segment_intersect.
+    for trial in range(300):
+        m = rng.choice([5, 20, 100])
+        segs = [((rng.randint(0, m), rng.randint(0, m)), (rng.randint(0, m), rng.randint(0, m)))
+                for _ in range(rng.randint(2, 15))]
+        expected = {(i, j) for i in range(len(segs)) for j in range(i + 1, len(segs))
+                    if line_segment_intersect(*segs[i], *segs[j])}
+        found = set()
+        for (p, through) in intersections(segs):
+            assert all(cross(*segs[i], p) == 0 for i in through)
+            found |= {(i, j) for i in through for j in through if i < j}
+        assert found == expected
+        assert (any_intersection(segs) is None) == (len(expected) == 0)
+    print("Sweep agrees with line_segment_intersect for all pairs of segments.")
+
+    n = 10**4
+    segs = []
+    for _ in range(n):
+        x, y = rng.randint(0, 10**6), rng.randint(0, 10**6)
+        segs.append(((x, y), (x + rng.randint(-3000, 3000), y + rng.randint(-3000, 3000))))
+    k = sum(1 for _ in intersections(segs))
+    print(f"The {n} random short segments have {k} intersection points.")
+    print(f"The first one is {any_intersection(segs)}.")
+
+    pts = {(0, 0)}
+    while len(pts) < 1000:
+        pts.add((rng.randint(1, 10**6), rng.randint(1, 10**6)))
+    star = convex_hull(list(pts), clean_only=True)
+    print(f"Star polygon with {len(star)} corners is simple: {polygon_is_simple(Polygon(star))}")
+    star[10], star[500] = star[500], star[10]
+    print(f"After swapping two of its corners: {polygon_is_simple(star)}")
+    print(f"Figure eight is simple: {polygon_is_simple([(0, 0), (2, 2), (2, 0), (0, 2)])}")
+
+
+if __name__ == "__main__":
+    __demo()
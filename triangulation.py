@@ -0,0 +1,360 @@
+import random
+from collections import deque
+from fractions import Fraction
+from math import isqrt, pi, sin, cos
+from time import perf_counter
+
+from geometry import cross, polygon_area_twice, convex_hull
+
+# NumPy is needed for the triangle index arrays and the vectorized
+# computations over all triangles. Without it, the triangulations are
+# returned as lists of index triples.
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# The comments of geometry.py mention that the area of a polygon could be
+# computed by splitting it into triangles, an interesting problem of its
+# own. Here are two ways to do that for a simple polygon of n corners.
+# Both return n - 2 triangles as triples of positions of corner points in
+# the polygon, each triangle in counterclockwise order.
+
+# Ear clipping repeatedly cuts off an ear, a convex corner whose triangle
+# with its two neighbours contains no other corner point. Only the reflex
+# corners can be inside such a triangle, so these are kept in a spatial
+# hash of grid cells to look at only the reflex corners near each ear.
+# Each ear test takes time proportional to the number of cells that its
+# triangle overlaps. When the edges are short compared to the size of
+# the whole polygon, that is a constant and the total time about linear.
+# But the long and thin triangles of spiky polygons such as the random
+# one in the demo each overlap about sqrt(n) cells of the n / 4 cells,
+# making the total time O(n**1.5), about 3 seconds for n = 10**4.
+
+
+def __result(triangles):
+    if np is not None:
+        return np.array(triangles, dtype=np.int64).reshape(-1, 3)
+    return triangles
+
+
+# The positions of the polygon corners in counterclockwise order.
+
+def __ccw_order(poly):
+    n = len(poly)
+    return list(range(n)) if polygon_area_twice(poly) >= 0 else list(range(n - 1, -1, -1))
+
+
+def ear_clipping(poly):
+    pts, order = list(poly), __ccw_order(poly)
+    n = len(order)
+    nxt = {order[i]: order[(i + 1) % n] for i in range(n)}
+    prv = {order[i]: order[i - 1] for i in range(n)}
+
+    def is_convex(i):
+        return cross(pts[prv[i]], pts[i], pts[nxt[i]]) > 0
+
+    # The spatial hash has about n / 4 cells over the bounding box.
+    x0, y0 = min(x for (x, y) in pts), min(y for (x, y) in pts)
+    w = max(max(x for (x, y) in pts) - x0, max(y for (x, y) in pts) - y0)
+    side = w / isqrt(max(1, n // 4)) if w > 0 else 1
+    slack = 1e-9 * (abs(x0) + w + 1)
+    cells, reflex = {}, set()
+
+    def cell(p):
+        return int((p[0] - x0) // side), int((p[1] - y0) // side)
+
+    def add(i):
+        reflex.add(i)
+        cells.setdefault(cell(pts[i]), set()).add(i)
+
+    def discard(i):
+        if i in reflex:
+            reflex.remove(i)
+            cells[cell(pts[i])].discard(i)
+
+    # Look at the reflex corners in the cells that the triangle overlaps,
+    # row by row. The ends of each row are computed in floating point, so
+    # they are widened by a little slack to cover any rounding errors.
+
+    def is_ear(i):
+        a, b, c = tri = pts[prv[i]], pts[i], pts[nxt[i]]
+        (_, cy1), (_, cy2) = cell((x0, min(a[1], b[1], c[1]))), cell((x0, max(a[1], b[1], c[1])))
+        for cy in range(cy1, cy2 + 1):
+            ylo, yhi = y0 + cy * side, y0 + (cy + 1) * side
+            xs = [p[0] for p in tri if ylo <= p[1] <= yhi]
+            for (p, q) in ((a, b), (b, c), (c, a)):
+                for y in (ylo, yhi):
+                    if (p[1] - y) * (q[1] - y) < 0:
+                        xs.append(p[0] + (y - p[1]) * (q[0] - p[0]) / (q[1] - p[1]))
+            if not xs:
+                continue
+            for cx in range(int((min(xs) - slack - x0) // side), int((max(xs) + slack - x0) // side) + 1):
+                for r in cells.get((cx, cy), ()):
+                    p = pts[r]
+                    if r != prv[i] and r != nxt[i] and p != a and p != c and \
+                            cross(a, b, p) >= 0 and cross(b, c, p) >= 0 and cross(c, a, p) >= 0:
+                        return False
+        return True
+
+    for i in order:
+        if not is_convex(i):
+            add(i)
+    triangles, alive, progress = [], set(order), None
+    queue = deque(i for i in order if i not in reflex)
+    while len(alive) > 3:
+        if not queue:
+            # Some ears may have become unblocked without their neighbours
+            # changing, so look at all the remaining convex corners again.
+            queue = deque(i for i in alive if i not in reflex)
+            progress = len(alive)
+        i = queue.popleft()
+        if i not in alive or i in reflex or not is_ear(i):
+            if not queue and len(alive) == progress:
+                raise ValueError("Polygon is not simple.")
+            continue
+        p, q = prv[i], nxt[i]
+        triangles.append((p, i, q))
+        alive.remove(i)
+        nxt[p], prv[q] = q, p
+        # The neighbours may have turned from reflex into convex.
+        for j in (p, q):
+            if j in reflex and is_convex(j):
+                discard(j)
+            if j not in reflex:
+                queue.append(j)
+    if len(alive) == 3:
+        i = alive.pop()
+        triangles.append((prv[i], i, nxt[i]))
+    return __result(triangles)
+
+
+# The other way first cuts the polygon with diagonals into y-monotone
+# pieces, whose every horizontal cross section is a single interval.
+# A sweep line from top to bottom finds these diagonals at the corners
+# where the boundary turns back up or down from the inside, keeping the
+# edges that cross the sweep line sorted from left to right, each edge
+# with its helper corner that the next diagonal would connect to.
+# https://en.wikipedia.org/wiki/Polygon_triangulation
+
+# Corner p is above corner q in the order of the sweep line.
+
+def __above(p, q):
+    return p[1] > q[1] or (p[1] == q[1] and p[0] < q[0])
+
+
+def __monotone_diagonals(pts, order):
+    n = len(order)
+    nxt = {order[i]: order[(i + 1) % n] for i in range(n)}
+    prv = {order[i]: order[i - 1] for i in range(n)}
+    # Edge i goes from corner i to corner nxt[i], downwards on the left
+    # side of the polygon interior.
+    status, helper, diagonals = [], {}, []
+    merge = set()
+
+    def left_of(v):
+        # The number of edges in the status strictly to the left of v.
+        lo, hi = 0, len(status)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            e = status[mid]
+            a, b = pts[e], pts[nxt[e]]
+            if not __above(a, b):
+                a, b = b, a
+            if cross(a, b, pts[v]) > 0:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def fix_up(v, e):
+        if helper[e] in merge:
+            diagonals.append((v, helper[e]))
+
+    for v in sorted(order, key=lambda i: (-pts[i][1], pts[i][0])):
+        u, w = prv[v], nxt[v]
+        up_u, up_w = __above(pts[u], pts[v]), __above(pts[w], pts[v])
+        convex = cross(pts[u], pts[v], pts[w]) > 0
+        if not up_u and not up_w:
+            if not convex:
+                # Split corner, connect up to the helper of the edge to its left.
+                e = status[left_of(v) - 1]
+                diagonals.append((v, helper[e]))
+                helper[e] = v
+            # Start corner or split corner.
+            status.insert(left_of(v), v)
+            helper[v] = v
+        elif up_u and up_w:
+            fix_up(v, u)
+            # Edge u ends at v, so it is the first edge not to the left of v.
+            del status[left_of(v)]
+            if not convex:
+                # Merge corner, to be connected down to a later corner.
+                merge.add(v)
+                e = status[left_of(v) - 1]
+                fix_up(v, e)
+                helper[e] = v
+        elif up_u:
+            # Regular corner with the interior to its right.
+            fix_up(v, u)
+            # Edge v replaces edge u in the same place.
+            status[left_of(v)] = v
+            helper[v] = v
+        else:
+            e = status[left_of(v) - 1]
+            fix_up(v, e)
+            helper[e] = v
+    return diagonals
+
+
+# Triangulate a y-monotone piece, given its corners in counterclockwise
+# order. Its two chains from the top corner to the bottom corner are
+# merged into one sorted order, and the corners are then connected with
+# a stack of the corners seen so far that still need to be triangulated.
+
+def __triangulate_monotone(pts, piece, triangles):
+    n = len(piece)
+    top = min(range(n), key=lambda i: (-pts[piece[i]][1], pts[piece[i]][0]))
+    bottom = max(range(n), key=lambda i: (-pts[piece[i]][1], pts[piece[i]][0]))
+    # The left chain goes forward from the top, the right chain backward.
+    left, i = [], top
+    while i != bottom:
+        left.append(piece[i])
+        i = (i + 1) % n
+    right, i = [], (top - 1) % n
+    while i != bottom:
+        right.append(piece[i])
+        i = (i - 1) % n
+    chain = {v: True for v in left}
+    chain.update({v: False for v in right})
+    chain[piece[bottom]] = None
+    verts = sorted(left + right, key=lambda v: (-pts[v][1], pts[v][0])) + [piece[bottom]]
+
+    def emit(a, b, c):
+        triangles.append((a, b, c) if cross(pts[a], pts[b], pts[c]) > 0 else (a, c, b))
+
+    stack = verts[:2]
+    for v in verts[2:-1]:
+        if chain[v] != chain[stack[-1]]:
+            # Connect v to every corner on the stack.
+            for (a, b) in zip(stack, stack[1:]):
+                emit(v, a, b)
+            stack = [stack[-1], v]
+        else:
+            last = stack.pop()
+            while stack:
+                c = cross(pts[stack[-1]], pts[last], pts[v])
+                if (c > 0) if chain[v] else (c < 0):
+                    emit(v, last, stack[-1])
+                    last = stack.pop()
+                else:
+                    break
+            stack += [last, v]
+    for (a, b) in zip(stack, stack[1:]):
+        emit(verts[-1], a, b)
+
+
+# The key that sorts the directions (dx, dy) by their angle from the
+# positive x-axis, with the slope computed exactly within each quadrant.
+
+def __angle_key(dx, dy):
+    if dx > 0 and dy >= 0:
+        return 0, Fraction(dy, dx)
+    if dx <= 0 and dy > 0:
+        return 1, Fraction(-dx, dy)
+    if dx < 0 and dy <= 0:
+        return 2, Fraction(dy, dx)
+    return 3, Fraction(dx, -dy)
+
+
+# The diagonals cut the polygon into pieces that are found by walking
+# around each piece, turning at each corner to the edge or diagonal that
+# is the next one clockwise from the edge that was arrived through.
+
+def __pieces(pts, order, diagonals):
+    n = len(order)
+    around = {order[i]: [order[i - 1], order[(i + 1) % n]] for i in range(n)}
+    for (a, b) in diagonals:
+        around[a].append(b)
+        around[b].append(a)
+    turn = {}
+    for (v, ws) in around.items():
+        ws.sort(key=lambda w: __angle_key(pts[w][0] - pts[v][0], pts[w][1] - pts[v][1]))
+        for (i, w) in enumerate(ws):
+            turn[(w, v)] = ws[i - 1]
+    # The edges and diagonals that have the interior on their left.
+    todo = {(order[i - 1], order[i]) for i in range(n)}
+    todo |= set(diagonals) | {(b, a) for (a, b) in diagonals}
+    pieces = []
+    while todo:
+        u, v = todo.pop()
+        piece = [u]
+        while v != piece[0]:
+            piece.append(v)
+            u, v = v, turn[(u, v)]
+            todo.discard((u, v))
+        pieces.append(piece)
+    return pieces
+
+
+def monotone_triangulation(poly):
+    pts, order = list(poly), __ccw_order(poly)
+    triangles = []
+    for piece in __pieces(pts, order, __monotone_diagonals(pts, order)):
+        __triangulate_monotone(pts, piece, triangles)
+    return __result(triangles)
+
+
+# The doubled signed areas and the centroids of all triangles at once,
+# given as an (m, 3) array of positions of corner points in the polygon.
+# Coordinates too big for the products to fit in 64 bits are computed
+# exactly with Python integers inside the NumPy arrays.
+
+def triangle_areas_twice(poly, triangles):
+    pts = np.asarray(poly)
+    if pts.dtype.kind in 'iu' and int(np.abs(pts).max()) >= 2**30:
+        pts = pts.astype(object)
+    a, b, c = (pts[triangles[:, i]] for i in range(3))
+    return (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0])
+
+
+def triangle_centroids(poly, triangles):
+    pts = np.asarray(poly, dtype=np.float64)
+    return (pts[triangles[:, 0]] + pts[triangles[:, 1]] + pts[triangles[:, 2]]) / 3
+
+
+def __demo():
+    rng = random.Random(12345)
+    pts = {(0, 0)}
+    while len(pts) < 1000:
+        pts.add((rng.randint(1, 10**6), rng.randint(1, 10**6)))
+    star = convex_hull(list(pts), clean_only=True)
+    area = polygon_area_twice(star)
+    print(f"Triangulating a star polygon with {len(star)} corners and doubled area {area}.")
+    for f in (ear_clipping, monotone_triangulation):
+        triangles = f(star)
+        if np is None:
+            assert sum(cross(star[a], star[b], star[c]) for (a, b, c) in triangles) == area
+            print(f"{f.__name__} produced {len(triangles)} triangles that add up to the same area.")
+            continue
+        areas = triangle_areas_twice(star, triangles)
+        assert (areas > 0).all() and int(areas.sum()) == area
+        print(f"{f.__name__} produced {len(triangles)} triangles that add up to the same area.")
+        # The centroid of the polygon is the area-weighted mean of the triangle centroids.
+        cx, cy = (triangle_centroids(star, triangles) * areas[:, None]).sum(axis=0) / area
+        print(f"The centroid of the polygon is ({cx:.3f}, {cy:.3f}).")
+
+    # A polygon with corners at random distances around the origin.
+    n = 10**4
+    angles = sorted(rng.uniform(0, 2 * pi) for _ in range(n))
+    radii = [rng.randint(10**6, 10**7) for _ in range(n)]
+    poly = [(round(r * cos(a)), round(r * sin(a))) for (r, a) in zip(radii, angles)]
+    for f in (ear_clipping, monotone_triangulation):
+        start = perf_counter()
+        triangles = f(poly)
+        print(f"{f.__name__} triangulated {n} corners in {perf_counter() - start:.2f} seconds.")
+
+
+if __name__ == "__main__":
+    __demo()